@@ -0,0 +1,86 @@
+"""
+Сравнение скорости извлечения ссылок: BeautifulSoup (полное дерево) и LinkExtractor (потоковый разбор).
+
+Запуск из каталога task2_link_search:
+    python -m benchmarks.link_parser_benchmark
+"""
+
+import timeit
+from urllib.parse import urlparse
+
+from bs4 import BeautifulSoup
+
+from link_search.link_search import LinkSearch
+from link_search.link_search.constants import HTML_CHUNK_SIZE
+from link_search.link_search.link_parser import LinkExtractor
+
+URL = 'http://site.ru'
+
+# Количество ссылок на странице
+PAGE_LINK_COUNTS = (100, 1000, 10000)
+
+# Лимиты ссылок (None - все ссылки на странице)
+LINK_LIMITS = (5, None)
+
+
+def make_html(link_count: int) -> str:
+    """
+    Генерирует страницу с заданным количеством ссылок
+    :param link_count: Количество ссылок
+    :return: HTML
+    """
+    items = []
+    for idx in range(link_count):
+        items.append(f'<div class="item"><p>Текст абзаца номер {idx}, немного слов для объема.</p>'
+                     f'<a class="link" href="/page/{idx}.html?q={idx}&amp;p=1">Ссылка {idx}</a></div>')
+    return f'<html><head><title>Тест</title></head><body>{"".join(items)}</body></html>'
+
+
+def soup_links(html: str, link_limit: int = None) -> list:
+    """
+    Прежний способ: строит дерево BeautifulSoup и перебирает все теги <a>
+    """
+    links = []
+    parsed_url = urlparse(URL)
+    soup = BeautifulSoup(html, 'lxml')
+    for tag in soup.find_all('a', href=True):
+        link = LinkSearch.prepare_link(tag['href'], parsed_url.scheme, parsed_url.netloc)
+        if not link:
+            continue
+        links.append(link)
+        if len(links) == link_limit:
+            break
+    return links
+
+
+def extractor_links(html: str, link_limit: int = None) -> list:
+    """
+    Потоковый разбор частями с остановкой после достижения лимита
+    """
+    links = []
+    parsed_url = urlparse(URL)
+    extractor = LinkExtractor(link_limit=link_limit,
+                              prepare=lambda href: LinkSearch.prepare_link(href, parsed_url.scheme, parsed_url.netloc))
+    for start in range(0, len(html), HTML_CHUNK_SIZE):
+        links += extractor.feed_links(html[start:start + HTML_CHUNK_SIZE])
+        if extractor.done:
+            return links
+    return links + extractor.close_links()
+
+
+def main():
+    print(f'{"ссылок":>8} {"лимит":>6} {"BeautifulSoup, мс":>18} {"LinkExtractor, мс":>18} {"ускорение":>10}')
+    for page_link_count in PAGE_LINK_COUNTS:
+        html = make_html(page_link_count)
+        number = max(1, 2000 // page_link_count)
+        for link_limit in LINK_LIMITS:
+            assert soup_links(html, link_limit) == extractor_links(html, link_limit)
+            soup_time = min(timeit.repeat(lambda: soup_links(html, link_limit), number=number, repeat=3)) / number
+            extractor_time = min(timeit.repeat(lambda: extractor_links(html, link_limit),
+                                               number=number, repeat=3)) / number
+            print(f'{page_link_count:>8} {str(link_limit or "все"):>6} {soup_time * 1000:>18.2f} '
+                  f'{extractor_time * 1000:>18.2f} {soup_time / extractor_time:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
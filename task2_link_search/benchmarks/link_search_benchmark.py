@@ -0,0 +1,106 @@
+"""
+Измерение производительности LinkSearch.get_search_links на локальном сервере (без обращения к сети).
+Выводит количество ссылок в секунду, время загрузки страниц (p50/p99) и пиковый объем памяти.
+
+Запуск из каталога task2_link_search:
+    python -m benchmarks.link_search_benchmark --latency 0.05 --page-size 100000 --links 200
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from link_search.link_search import LinkSearch
+
+from .local_server import LocalSearchServer
+
+
+class TimedLinkSearch(LinkSearch):
+    """
+    LinkSearch, запоминающий время загрузки и разбора каждой страницы
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fetch_times = []
+
+    def iter_site_links(self, *args, **kwargs):
+        start_time = time.perf_counter()
+        try:
+            yield from super().iter_site_links(*args, **kwargs)
+        finally:
+            self.fetch_times.append(time.perf_counter() - start_time)
+
+
+def percentile(values: list, percent: float) -> float:
+    """
+    Перцентиль (по ближайшему рангу)
+    :param values: Значения
+    :param percent: Процент от 0 до 100
+    :return: Значение перцентиля
+    """
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[max(0, min(len(values) - 1, round(percent / 100 * len(values)) - 1))]
+
+
+def run(server: LocalSearchServer, link_count: int, deep: bool, concurrency: int, trace_memory: bool) -> dict:
+    """
+    Выполняет один поиск
+    :param server: Локальный сервер
+    :param link_count: Количество ссылок
+    :param deep: Глубокий поиск
+    :param concurrency: Количество одновременных запросов
+    :param trace_memory: Измерять пиковый объем памяти (замедляет выполнение)
+    :return: Результаты измерений
+    """
+    link_search = TimedLinkSearch(concurrency=concurrency, search_params=server.search_params)
+    if trace_memory:
+        tracemalloc.start()
+
+    start_time = time.perf_counter()
+    links = link_search.get_search_links('benchmark', link_count, deep)
+    elapsed = time.perf_counter() - start_time
+
+    peak_memory = None
+    if trace_memory:
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    link_search.close()
+
+    return {
+        'links': len(links),
+        'elapsed': elapsed,
+        'links_per_sec': len(links) / elapsed if elapsed else 0.0,
+        'p50': percentile(link_search.fetch_times, 50),
+        'p99': percentile(link_search.fetch_times, 99),
+        'fetches': len(link_search.fetch_times),
+        'peak_memory': peak_memory
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Измерение производительности LinkSearch на локальном сервере')
+    parser.add_argument('--latency', type=float, default=0.05, help='Задержка ответа сервера, с')
+    parser.add_argument('--page-size', type=int, default=50000, help='Размер страницы, байт')
+    parser.add_argument('--links', type=int, default=100, help='Количество ссылок в результате поиска')
+    parser.add_argument('--concurrency', type=int, default=10, help='Количество одновременных запросов')
+    parser.add_argument('--results-per-page', type=int, default=10, help='Результатов на странице поиска')
+    parser.add_argument('--links-per-site', type=int, default=20, help='Ссылок на странице сайта')
+    args = parser.parse_args()
+
+    server = LocalSearchServer(args.latency, args.page_size, args.results_per_page,
+                               search_pages=args.links, links_per_site=args.links_per_site)
+    with server:
+        print(f'{"режим":>8} {"ссылок":>7} {"загрузок":>9} {"ссылок/с":>9} {"p50, мс":>8} {"p99, мс":>8} '
+              f'{"память, КБ":>11}')
+        for deep in (False, True):
+            result = run(server, args.links, deep, args.concurrency, trace_memory=False)
+            memory = run(server, args.links, deep, args.concurrency, trace_memory=True)['peak_memory']
+            print(f'{"deep" if deep else "shallow":>8} {result["links"]:>7} {result["fetches"]:>9} '
+                  f'{result["links_per_sec"]:>9.1f} {result["p50"] * 1000:>8.1f} {result["p99"] * 1000:>8.1f} '
+                  f'{memory / 1024:>11.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""
+Локальный HTTP-сервер, имитирующий поисковую выдачу Yandex и сайты из нее.
+Используется для измерения производительности и тестов без обращения к сети.
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import time
+import sys
+from urllib.parse import urlsplit, parse_qs
+
+from link_search.link_search.constants import YANDEX_SEARCH_PARAMS
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Клиент закрывает соединение, как только получил нужные ссылки
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class LocalSearchServer:
+    """
+    Сервер отдает:
+        /search/?text=...&p=N - страницу результатов поиска со ссылками с классом YANDEX_SEARCH_PARAMS['link_class']
+                                на сайты сервера (пустую страницу после search_pages страниц);
+        /site/<имя>           - страницу сайта со ссылками на другие страницы сервера.
+    Перед каждым ответом выдерживается задержка latency, страницы дополняются текстом до размера page_size.
+    """
+    def __init__(self, latency: float = 0.0, page_size: int = 0, results_per_page: int = 10, search_pages: int = 5,
+                 links_per_site: int = 20):
+        """
+        :param latency: Задержка ответа в секундах
+        :param page_size: Минимальный размер страницы в байтах
+        :param results_per_page: Количество результатов на странице поиска
+        :param search_pages: Количество страниц поиска
+        :param links_per_site: Количество ссылок на странице сайта
+        """
+        self.latency = latency
+        self.page_size = page_size
+        self.results_per_page = results_per_page
+        self.search_pages = search_pages
+        self.links_per_site = links_per_site
+
+        # Количество обработанных запросов
+        self.request_count = 0
+
+        self.__server = _HTTPServer(('127.0.0.1', 0), self.__create_handler())
+        self.__thread = None
+        self.__lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        """
+        Возвращает адрес сервера
+        :return: URL
+        """
+        host, port = self.__server.server_address
+        return f'http://{host}:{port}'
+
+    @property
+    def search_params(self) -> dict:
+        """
+        Возвращает параметры поиска для LinkSearch(search_params=...)
+        :return: Параметры поиска
+        """
+        return dict(YANDEX_SEARCH_PARAMS, url=self.url + '/search/?text={}&p={}')
+
+    def start(self):
+        self.__thread = threading.Thread(target=self.__server.serve_forever, daemon=True)
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        self.__server.shutdown()
+        self.__server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def count_request(self):
+        """
+        Учитывает обработанный запрос
+        """
+        with self.__lock:
+            self.request_count += 1
+
+    def render_search_page(self, text: str, page: int) -> str:
+        """
+        Страница результатов поиска
+        :param text: Строка поиска
+        :param page: Номер страницы
+        :return: HTML
+        """
+        items = []
+        if page < self.search_pages:
+            for idx in range(self.results_per_page):
+                name = f'{text}-{page}-{idx}'
+                items.append(f'<li><a class="link {YANDEX_SEARCH_PARAMS["link_class"]}" '
+                             f'href="{self.url}/site/{name}">{name}</a>'
+                             f'<a href="{self.url}/ads/{name}">реклама</a></li>')
+        return self.__render_page(f'Поиск: {text}', ''.join(items))
+
+    def render_site_page(self, name: str) -> str:
+        """
+        Страница сайта
+        :param name: Имя страницы
+        :return: HTML
+        """
+        items = [f'<p><a href="{self.url}/site/{name}/{idx}">Страница {idx}</a></p>'
+                 for idx in range(self.links_per_site)]
+        return self.__render_page(name, ''.join(items))
+
+    def __render_page(self, title: str, body: str) -> str:
+        """
+        Формирует страницу, дополняя ее текстом до page_size байт
+        """
+        html = f'<html><head><title>{title}</title></head><body>{body}'
+        padding = self.page_size - len(html.encode('utf-8'))
+        if padding > 0:
+            html += '<p>' + 'x' * padding + '</p>'
+        return html + '</body></html>'
+
+    def __create_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                server.count_request()
+                if server.latency:
+                    time.sleep(server.latency)
+
+                parsed_url = urlsplit(self.path)
+                if parsed_url.path == '/search/':
+                    query = parse_qs(parsed_url.query)
+                    html = server.render_search_page(query.get('text', [''])[0], int(query.get('p', ['0'])[0]))
+                elif parsed_url.path.startswith('/site/'):
+                    html = server.render_site_page(parsed_url.path[len('/site/'):])
+                else:
+                    self.send_error(404)
+                    return
+
+                body = html.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -2,5 +2,10 @@
 Модуль для поиска ссылок по строке поиска или с конкретного сайта.
 При поиске по строке поиска используется Yandex.
 """
+from .batch import BatchSearch
+from .cache import FileResponseCache, MemoryResponseCache
+from .checkpoint import CrawlCheckpoint
+from .crawler import Crawler
 from .link_search import LinkSearch
+from .metrics import Metrics
 from .version import __version__
@@ -0,0 +1,105 @@
+"""
+Асинхронное получение ссылок с нескольких сайтов
+"""
+
+__author__ = 'Игнатьев И.В.'
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+from .constants import DEFAULT_CONCURRENCY
+
+
+def run_sync(coroutine):
+    """
+    Синхронно выполняет сопрограмму.
+    Если в текущем потоке уже работает цикл событий (вызов из асинхронного кода),
+    сопрограмма выполняется в отдельном цикле событий во вспомогательном потоке.
+    :param coroutine: Сопрограмма
+    :return: Результат сопрограммы
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
+
+
+class AsyncLinkFetcher:
+    """
+    Параллельно получает ссылки с нескольких сайтов.
+    Блокирующие запросы выполняются в пуле потоков, количество одновременных запросов ограничено.
+    """
+    def __init__(self, get_links, concurrency: int = DEFAULT_CONCURRENCY):
+        """
+        :param get_links: Функция получения ссылок с сайта: get_links(url) -> list
+        :param concurrency: Максимальное количество одновременных запросов
+        """
+        if not isinstance(concurrency, int) or concurrency < 1:
+            raise ValueError('Количество одновременных запросов должно быть целым положительным числом.')
+
+        self.__get_links = get_links
+        self.__concurrency = concurrency
+
+    @property
+    def concurrency(self) -> int:
+        """
+        Возвращает максимальное количество одновременных запросов
+        :return: Количество запросов
+        """
+        return self.__concurrency
+
+    async def iter_links(self, urls):
+        """
+        Асинхронный генератор. Возвращает пары (url, ссылки) по мере загрузки сайтов.
+        При досрочном завершении генератора незапущенные запросы отменяются.
+        :param urls: Адреса сайтов
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.__concurrency)
+        executor = ThreadPoolExecutor(max_workers=self.__concurrency)
+
+        async def fetch(url):
+            async with semaphore:
+                return url, await loop.run_in_executor(executor, self.__get_links, url)
+
+        tasks = [asyncio.ensure_future(fetch(url)) for url in urls]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+            executor.shutdown(wait=False)
+
+    def collect(self, urls, stop=None, deadline: float = None) -> list:
+        """
+        Синхронно получает ссылки с сайтов. Можно вызывать и из асинхронного кода (см. run_sync).
+        :param urls: Адреса сайтов
+        :param stop: Функция stop(url, links) -> bool, вызывается по мере загрузки сайтов.
+                     Если вернула True, оставшиеся запросы отменяются.
+        :param deadline: Время (по time.monotonic), после которого незавершенные запросы не ожидаются
+        :return: Пары (url, ссылки) в порядке завершения загрузки
+        """
+        async def run():
+            result = []
+            links_gen = self.iter_links(urls)
+            try:
+                while True:
+                    timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                    try:
+                        url, links = await asyncio.wait_for(links_gen.__anext__(), timeout)
+                    except (StopAsyncIteration, asyncio.TimeoutError):
+                        break
+
+                    result.append((url, links))
+                    if stop is not None and stop(url, links):
+                        break
+            finally:
+                await links_gen.aclose()
+            return result
+
+        return run_sync(run())
@@ -0,0 +1,170 @@
+"""
+Одновременный поиск по нескольким строкам поиска
+"""
+
+__author__ = 'Игнатьев И.В.'
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import queue
+import threading
+
+from .constants import DEFAULT_CONCURRENCY, DEFAULT_LINK_LIMIT
+from .rate_limit import TokenBucket
+from .url_index import UrlIndex
+
+
+class BatchSearch:
+    """
+    Выполняет поиск по нескольким строкам одновременно.
+    Все запросы выполняются в общем пуле с ограничением количества одновременных запросов и частоты запросов.
+    Страница, нужная нескольким поискам (страница выдачи или сайт), загружается один раз.
+    """
+    def __init__(self, link_search, concurrency: int = DEFAULT_CONCURRENCY, rate: float = None):
+        """
+        :param link_search: LinkSearch, через который загружаются страницы
+        :param concurrency: Максимальное количество одновременных запросов для всех поисков
+        :param rate: Максимальное количество запросов в секунду для всех поисков. None - без ограничения.
+        """
+        if not isinstance(concurrency, int) or concurrency < 1:
+            raise ValueError('Количество одновременных запросов должно быть целым положительным числом.')
+
+        self.__link_search = link_search
+        self.__concurrency = concurrency
+        self.__rate = rate
+
+    def iter_search_links(self, search_strings, link_count: int = DEFAULT_LINK_LIMIT, deep=False):
+        """
+        Генератор результатов поиска. Результат поиска возвращается сразу после его завершения.
+        При остановке генератора незавершенные поиски отменяются.
+        :param search_strings: Строки поиска
+        :param link_count: Количество ссылок в результате каждого поиска
+        :param deep: Глубокий поиск
+        """
+        search_strings = list(dict.fromkeys(search_string for search_string in search_strings if search_string))
+        if not search_strings or not link_count or link_count < 0 or not isinstance(link_count, int):
+            return
+
+        # Поиски выполняются в цикле событий в отдельном потоке, результаты передаются через очередь
+        results = queue.Queue()
+        loop = asyncio.new_event_loop()
+        main_task = loop.create_task(self.__run(search_strings, link_count, deep, results))
+
+        def run_loop():
+            try:
+                loop.run_until_complete(main_task)
+            except asyncio.CancelledError:
+                pass
+            finally:
+                loop.close()
+
+        thread = threading.Thread(target=run_loop, daemon=True)
+        thread.start()
+
+        try:
+            for _ in search_strings:
+                result = results.get()
+                if isinstance(result, BaseException):
+                    raise result
+                yield result
+        finally:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(main_task.cancel)
+            thread.join()
+
+    def get_search_links(self, search_strings, link_count: int = DEFAULT_LINK_LIMIT, deep=False) -> dict:
+        """
+        Возвращает результаты поиска по всем строкам
+        :param search_strings: Строки поиска
+        :param link_count: Количество ссылок в результате каждого поиска
+        :param deep: Глубокий поиск
+        :return: Строка поиска -> ссылки
+        """
+        return dict(self.iter_search_links(search_strings, link_count, deep))
+
+    async def __run(self, search_strings: list, link_count: int, deep: bool, results: queue.Queue):
+        """
+        Выполняет все поиски и передает результаты в очередь по мере завершения
+        """
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=self.__concurrency)
+        bucket = TokenBucket(self.__rate) if self.__rate else None
+
+        # (url, CSS-класс) -> Future со ссылками, общие для всех поисков
+        fetches = {}
+
+        async def get_links(url: str, link_class: str = None, deadline: float = None) -> list:
+            key = (url, link_class)
+            future = fetches.get(key)
+            if future is None:
+                future = fetches[key] = asyncio.ensure_future(load_links(url, link_class, deadline))
+            return await asyncio.shield(future)
+
+        async def load_links(url: str, link_class: str, deadline: float) -> list:
+            if bucket is not None:
+                await bucket.acquire_async()
+            return await loop.run_in_executor(executor, lambda: self.__link_search.get_site_links(
+                url, link_class=link_class, deadline=deadline))
+
+        async def search(search_string: str):
+            links = await self.__search(search_string, link_count, deep, get_links)
+            results.put((search_string, links))
+
+        tasks = [asyncio.ensure_future(search(search_string)) for search_string in search_strings]
+        try:
+            await asyncio.gather(*tasks)
+        except asyncio.CancelledError:
+            raise
+        except Exception as error:
+            results.put(error)
+        finally:
+            # Загрузки, начатые для отмененных поисков, не ожидаются
+            pending = list(tasks) + list(fetches.values())
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            executor.shutdown(wait=False)
+
+    async def __search(self, search_string: str, link_count: int, deep: bool, get_links) -> list:
+        """
+        Один поиск (аналог LinkSearch.get_search_links)
+        :param search_string: Строка поиска
+        :param link_count: Количество ссылок в результате
+        :param deep: Глубокий поиск
+        :param get_links: Функция получения ссылок get_links(url, link_class, deadline)
+        :return: Ссылки
+        """
+        search_params = self.__link_search.search_params
+        deadline = self.__link_search.policy.get_deadline()
+        found_links = UrlIndex(self.__link_search.url_index_capacity)
+        visited_links = UrlIndex(self.__link_search.url_index_capacity)
+
+        links = []
+        search_page = 0
+        while len(links) < link_count:
+            search_links = await get_links(search_params['url'].format(search_string, search_page),
+                                           search_params['link_class'], deadline)
+            search_links = [search_link for search_link in search_links if visited_links.add(search_link)]
+            if not search_links:
+                break
+
+            if not deep:
+                links.extend(link for link in search_links if found_links.add(link))
+            else:
+                # Ссылки добавляются по мере загрузки сайтов, после набора нужного количества ожидание прекращается
+                async def get_site_links(search_link):
+                    return search_link, await get_links(search_link, None, deadline)
+
+                site_tasks = [asyncio.ensure_future(get_site_links(search_link)) for search_link in search_links]
+                try:
+                    for future in asyncio.as_completed(site_tasks):
+                        search_link, site_links = await future
+                        links.extend(link for link in [search_link] + site_links if found_links.add(link))
+                        if len(links) >= link_count:
+                            break
+                finally:
+                    for task in site_tasks:
+                        task.cancel()
+
+            search_page += 1
+        return links[:link_count]
@@ -0,0 +1,217 @@
+"""
+Кэш HTTP-ответов
+"""
+
+__author__ = 'Игнатьев И.В.'
+
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import threading
+import time
+
+from .constants import DEFAULT_CACHE_TTL, DEFAULT_CACHE_MAX_SIZE
+
+
+class CacheEntry:
+    """
+    Закэшированный ответ сайта
+    """
+    def __init__(self, body: str, etag: str = None, last_modified: str = None, stored_at: float = None):
+        """
+        :param body: Тело ответа
+        :param etag: Заголовок ETag
+        :param last_modified: Заголовок Last-Modified
+        :param stored_at: Время сохранения (или последней успешной проверки) ответа
+        """
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = time.time() if stored_at is None else stored_at
+
+    def is_fresh(self, ttl: float) -> bool:
+        """
+        Не истекло ли время жизни ответа
+        :param ttl: Время жизни в секундах
+        :return: Ответ актуален
+        """
+        return time.time() - self.stored_at < ttl
+
+    def validators(self) -> dict:
+        """
+        Возвращает заголовки для условного запроса
+        :return: Заголовки If-None-Match/If-Modified-Since
+        """
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def to_dict(self) -> dict:
+        return {'body': self.body, 'etag': self.etag, 'last_modified': self.last_modified,
+                'stored_at': self.stored_at}
+
+    @staticmethod
+    def from_dict(data: dict):
+        return CacheEntry(data['body'], data.get('etag'), data.get('last_modified'), data.get('stored_at'))
+
+
+class ResponseCache(ABC):
+    """
+    Кэш ответов сайтов.
+    Ответ, у которого не истекло время жизни, используется без запроса к сайту.
+    Устаревший ответ с заголовками ETag/Last-Modified проверяется условным запросом.
+    """
+    def __init__(self, ttl: float = DEFAULT_CACHE_TTL, max_size: int = DEFAULT_CACHE_MAX_SIZE):
+        """
+        :param ttl: Время жизни ответа в секундах
+        :param max_size: Максимальный суммарный размер ответов в байтах
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+
+    @abstractmethod
+    def get(self, url: str) -> CacheEntry:
+        """
+        Возвращает ответ из кэша
+        :param url: URL
+        :return: Ответ или None
+        """
+
+    @abstractmethod
+    def set(self, url: str, entry: CacheEntry):
+        """
+        Сохраняет ответ в кэш
+        :param url: URL
+        :param entry: Ответ
+        """
+
+    def touch(self, url: str):
+        """
+        Продлевает время жизни ответа (после того, как сайт подтвердил, что он не изменился)
+        :param url: URL
+        """
+        entry = self.get(url)
+        if entry is not None:
+            entry.stored_at = time.time()
+            self.set(url, entry)
+
+
+class MemoryResponseCache(ResponseCache):
+    """
+    Кэш ответов в памяти
+    """
+    def __init__(self, ttl: float = DEFAULT_CACHE_TTL, max_size: int = DEFAULT_CACHE_MAX_SIZE):
+        super().__init__(ttl, max_size)
+        self.__entries = OrderedDict()
+        self.__size = 0
+        self.__lock = threading.Lock()
+
+    def get(self, url: str) -> CacheEntry:
+        with self.__lock:
+            entry = self.__entries.get(url)
+            if entry is not None:
+                self.__entries.move_to_end(url)
+            return entry
+
+    def set(self, url: str, entry: CacheEntry):
+        with self.__lock:
+            old_entry = self.__entries.pop(url, None)
+            if old_entry is not None:
+                self.__size -= len(old_entry.body)
+            self.__entries[url] = entry
+            self.__size += len(entry.body)
+
+            # Вытесняем давно не использованные ответы
+            while self.__size > self.max_size and self.__entries:
+                _, old_entry = self.__entries.popitem(last=False)
+                self.__size -= len(old_entry.body)
+
+
+class FileResponseCache(ResponseCache):
+    """
+    Кэш ответов на диске. Каждый ответ хранится в отдельном JSON-файле.
+    """
+    def __init__(self, directory: str, ttl: float = DEFAULT_CACHE_TTL, max_size: int = DEFAULT_CACHE_MAX_SIZE):
+        """
+        :param directory: Каталог кэша
+        :param ttl: Время жизни ответа в секундах
+        :param max_size: Максимальный суммарный размер файлов кэша в байтах
+        """
+        super().__init__(ttl, max_size)
+        self.__directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+        # Имя файла -> размер, в порядке последнего использования
+        self.__files = OrderedDict()
+        self.__size = 0
+        self.__lock = threading.Lock()
+
+        files = []
+        for file_name in os.listdir(directory):
+            if file_name.endswith('.json'):
+                stat = os.stat(os.path.join(directory, file_name))
+                files.append((stat.st_mtime, file_name, stat.st_size))
+        for _, file_name, size in sorted(files):
+            self.__files[file_name] = size
+            self.__size += size
+
+    def get(self, url: str) -> CacheEntry:
+        file_name = self.__file_name(url)
+        with self.__lock:
+            if file_name not in self.__files:
+                return None
+            try:
+                with open(os.path.join(self.__directory, file_name), encoding='utf-8') as file:
+                    data = json.load(file)
+            except (OSError, ValueError):
+                self.__remove(file_name)
+                return None
+            self.__files.move_to_end(file_name)
+
+        # Совпадение хэша при разных адресах
+        if data.get('url') != url:
+            return None
+        return CacheEntry.from_dict(data)
+
+    def set(self, url: str, entry: CacheEntry):
+        file_name = self.__file_name(url)
+        data = json.dumps(dict(entry.to_dict(), url=url), ensure_ascii=False).encode('utf-8')
+        path = os.path.join(self.__directory, file_name)
+        with self.__lock:
+            # Запись через временный файл, чтобы не оставить поврежденный файл
+            tmp_path = f'{path}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'wb') as file:
+                file.write(data)
+            os.replace(tmp_path, path)
+
+            self.__size += len(data) - self.__files.pop(file_name, 0)
+            self.__files[file_name] = len(data)
+
+            # Вытесняем давно не использованные ответы
+            while self.__size > self.max_size and self.__files:
+                self.__remove(next(iter(self.__files)))
+
+    def __remove(self, file_name: str):
+        """
+        Удаляет файл кэша. Вызывается под блокировкой.
+        :param file_name: Имя файла
+        """
+        self.__size -= self.__files.pop(file_name, 0)
+        try:
+            os.remove(os.path.join(self.__directory, file_name))
+        except OSError:
+            pass
+
+    @staticmethod
+    def __file_name(url: str) -> str:
+        """
+        Возвращает имя файла кэша для URL
+        :param url: URL
+        :return: Имя файла
+        """
+        return hashlib.sha1(url.encode('utf-8')).hexdigest() + '.json'
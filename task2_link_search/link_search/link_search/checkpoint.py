@@ -0,0 +1,111 @@
+"""
+Сохранение состояния обхода сайтов для продолжения после прерывания
+"""
+
+__author__ = 'Игнатьев И.В.'
+
+import json
+import sqlite3
+import threading
+
+
+class CrawlCheckpoint:
+    """
+    Хранит состояние обхода в базе SQLite: найденные ссылки (в порядке нахождения) и страницы для обхода
+    (очередь и загруженные страницы). Состояние сохраняется после загрузки каждой страницы одной транзакцией,
+    поэтому после прерывания обход продолжается без повторной загрузки страниц
+    (повторно загружаются только страницы, загрузка которых не была завершена).
+    Также хранятся параметры обхода (строка поиска, глубина и т.д.), чтобы не продолжить чужой обход.
+    Хранилище можно использовать из разных потоков (обход из асинхронного кода выполняется во вспомогательном потоке).
+    """
+    def __init__(self, path: str):
+        """
+        :param path: Путь к файлу базы
+        """
+        self.path = path
+        self.__connection = sqlite3.connect(path, check_same_thread=False)
+        self.__lock = threading.Lock()
+        self.__connection.execute('PRAGMA journal_mode=WAL')
+        self.__connection.execute('PRAGMA synchronous=NORMAL')
+        with self.__connection:
+            self.__connection.execute('CREATE TABLE IF NOT EXISTS links ('
+                                      'id INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT NOT NULL UNIQUE)')
+            self.__connection.execute('CREATE TABLE IF NOT EXISTS pages ('
+                                      'url TEXT PRIMARY KEY, depth INTEGER NOT NULL, priority REAL NOT NULL, '
+                                      'done INTEGER NOT NULL DEFAULT 0)')
+            self.__connection.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def started(self) -> bool:
+        """
+        Сохранялось ли состояние (начат ли обход)
+        :return: Начат
+        """
+        with self.__lock:
+            return self.__connection.execute('SELECT EXISTS (SELECT 1 FROM pages) OR EXISTS (SELECT 1 FROM links)'
+                                             ).fetchone()[0] == 1
+
+    def check_params(self, params: dict):
+        """
+        Сохраняет параметры обхода или, если они уже сохранены, проверяет совпадение с ними
+        :param params: Параметры обхода (значения должны сериализоваться в JSON)
+        """
+        value = json.dumps(params, sort_keys=True, ensure_ascii=False)
+        with self.__lock, self.__connection:
+            row = self.__connection.execute("SELECT value FROM meta WHERE key = 'params'").fetchone()
+            if row is None:
+                self.__connection.execute("INSERT INTO meta (key, value) VALUES ('params', ?)", (value,))
+            elif row[0] != value:
+                raise ValueError(f'Сохранено состояние обхода с другими параметрами: {row[0]}.')
+
+    def get_links(self) -> list:
+        """
+        Возвращает найденные ссылки в порядке нахождения
+        :return: Ссылки
+        """
+        with self.__lock:
+            return [url for url, in self.__connection.execute('SELECT url FROM links ORDER BY id')]
+
+    def iter_pages(self):
+        """
+        Генератор всех страниц, добавленных в обход (загруженных и ожидающих загрузки)
+        :return: Ссылки на страницы
+        """
+        with self.__lock:
+            urls = [url for url, in self.__connection.execute('SELECT url FROM pages')]
+        yield from urls
+
+    def get_pending(self) -> list:
+        """
+        Возвращает страницы, ожидающие загрузки
+        :return: Список (ссылка, глубина, приоритет)
+        """
+        with self.__lock:
+            return self.__connection.execute('SELECT url, depth, priority FROM pages WHERE done = 0').fetchall()
+
+    def save(self, links: list, pages: list, done_url: str = None):
+        """
+        Сохраняет результат загрузки страницы
+        :param links: Новые найденные ссылки
+        :param pages: Новые страницы для обхода: список (ссылка, глубина, приоритет)
+        :param done_url: Загруженная страница (None для начальных ссылок)
+        """
+        with self.__lock, self.__connection:
+            self.__connection.executemany('INSERT OR IGNORE INTO links (url) VALUES (?)', [(link,) for link in links])
+            self.__connection.executemany('INSERT OR IGNORE INTO pages (url, depth, priority) VALUES (?, ?, ?)',
+                                          pages)
+            if done_url is not None:
+                self.__connection.execute('UPDATE pages SET done = 1 WHERE url = ?', (done_url,))
+
+    def close(self):
+        """
+        Закрывает базу
+        """
+        with self.__lock:
+            self.__connection.close()
@@ -4,6 +4,8 @@
 
 __author__ = 'Игнатьев И.В.'
 
+import os
+
 YANDEX_SEARCH_PARAMS = {
     # Шаблон поискового запроса
     'url': 'https://yandex.ru/search/?text={}&p={}',
@@ -13,3 +15,100 @@ YANDEX_SEARCH_PARAMS = {
 }
 
 DEFAULT_LINK_LIMIT = 10
+
+# Максимальное количество запросов в секунду к хостам (с поддоменами), превышение которого приводит к блокировке
+DEFAULT_HOST_RATES = {
+    'yandex.ru': 2
+}
+
+# Максимальное количество одновременных запросов при глубоком поиске
+DEFAULT_CONCURRENCY = 10
+
+# Максимальное количество HTTP-сессий (по одной на каждый proxy)
+DEFAULT_MAX_SESSIONS = 32
+
+# Максимальное количество соединений с одним хостом в сессии
+DEFAULT_POOL_SIZE = DEFAULT_CONCURRENCY
+
+# Время простоя сессии в секундах, после которого она закрывается
+DEFAULT_SESSION_IDLE_TIMEOUT = 60
+
+# Время жизни ответа в кэше, в секундах
+DEFAULT_CACHE_TTL = 60 * 60
+
+# Максимальный размер кэша ответов, в байтах
+DEFAULT_CACHE_MAX_SIZE = 100 * 1024 * 1024
+
+# Размер части HTML, передаваемой в разбор, в символах
+HTML_CHUNK_SIZE = 16 * 1024
+
+# Размер части тела ответа, читаемой за один раз, в байтах
+STREAM_CHUNK_SIZE = 16 * 1024
+
+# Максимальное количество байт, загружаемое с одной страницы
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+
+# Допустимая вероятность ложного срабатывания фильтра Блума в индексе ссылок
+DEFAULT_BLOOM_ERROR_RATE = 0.001
+
+# Глубина обхода сайтов по умолчанию
+DEFAULT_CRAWL_DEPTH = 2
+
+# Количество результатов поиска, с которых начинается обход сайтов (примерно одна страница выдачи)
+DEFAULT_CRAWL_SEED_COUNT = 10
+
+# Минимальный интервал между запросами к одному хосту при обходе, в секундах
+DEFAULT_HOST_DELAY = 0.5
+
+# Максимальное количество одновременных запросов к одному хосту при обходе
+DEFAULT_HOST_CONCURRENCY = 2
+
+# Время, на которое proxy исключается после первой ошибки, в секундах (удваивается при ошибках подряд)
+DEFAULT_PROXY_COOLDOWN = 5
+
+# Максимальное время исключения proxy после ошибок, в секундах
+MAX_PROXY_COOLDOWN = 10 * 60
+
+# Время ответа proxy, для которого еще нет статистики, в секундах
+DEFAULT_PROXY_LATENCY = 1.0
+
+# Коэффициент сглаживания времени ответа proxy (доля последнего замера)
+PROXY_LATENCY_SMOOTHING = 0.3
+
+# Таймаут установки соединения, в секундах
+DEFAULT_CONNECT_TIMEOUT = 5
+
+# Таймаут ожидания данных от сайта, в секундах
+DEFAULT_READ_TIMEOUT = 10
+
+# Максимальное время одного поиска, в секундах
+DEFAULT_SEARCH_TIMEOUT = 60
+
+# Количество повторов запроса при временных ошибках
+DEFAULT_RETRIES = 2
+
+# Базовая и максимальная задержка перед повтором запроса, в секундах
+DEFAULT_RETRY_BACKOFF = 0.5
+MAX_RETRY_BACKOFF = 5
+
+# Коды ответа, при которых запрос повторяется
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Количество ошибок подряд, после которого запросы к хосту приостанавливаются
+DEFAULT_BREAKER_THRESHOLD = 5
+
+# Время приостановки запросов к хосту, в секундах
+DEFAULT_BREAKER_TIMEOUT = 30
+
+# Границы интервалов гистограмм времени этапов загрузки страниц, в секундах
+METRIC_TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Границы интервалов гистограммы количества ссылок, полученных со страницы
+METRIC_LINK_BUCKETS = (0, 1, 5, 10, 25, 50, 100, 250)
+
+# Набор User-Agent, поставляемый с пакетом
+USER_AGENTS_FILE = os.path.join(os.path.dirname(__file__), 'data', 'user_agents.txt')
+
+# Дисковый кэш набора User-Agent (общий для всех процессов) и время, в течение которого он актуален, в секундах
+DEFAULT_USER_AGENT_CACHE = os.path.join(os.path.expanduser('~'), '.cache', 'link_search', 'user_agents.txt')
+DEFAULT_USER_AGENT_CACHE_TTL = 7 * 24 * 60 * 60
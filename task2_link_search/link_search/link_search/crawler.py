@@ -0,0 +1,249 @@
+"""
+Многоуровневый обход сайтов в ширину
+"""
+
+__author__ = 'Игнатьев И.В.'
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import heapq
+import itertools
+
+from .async_fetch import run_sync
+from .constants import DEFAULT_CONCURRENCY, DEFAULT_CRAWL_DEPTH, DEFAULT_HOST_DELAY, DEFAULT_HOST_CONCURRENCY, \
+    DEFAULT_LINK_LIMIT
+from .checkpoint import CrawlCheckpoint
+from .url_index import get_host, UrlIndex
+
+
+class Frontier:
+    """
+    Очередь ссылок для обхода с приоритетами.
+    Ссылки хранятся в отдельных очередях по хостам. Ссылка выдается только если к ее хосту
+    выполняется меньше host_concurrency запросов и с начала предыдущего запроса прошло не меньше host_delay секунд.
+    """
+    def __init__(self, host_delay: float = DEFAULT_HOST_DELAY, host_concurrency: int = DEFAULT_HOST_CONCURRENCY):
+        """
+        :param host_delay: Минимальный интервал между запросами к одному хосту, в секундах
+        :param host_concurrency: Максимальное количество одновременных запросов к одному хосту
+        """
+        self.__host_delay = host_delay
+        self.__host_concurrency = host_concurrency
+
+        # Хост -> очередь (приоритет, порядковый номер, глубина, ссылка)
+        self.__queues = {}
+
+        # Хост -> количество выполняемых запросов
+        self.__active = {}
+
+        # Хост -> время, с которого разрешен следующий запрос
+        self.__ready_at = {}
+
+        self.__counter = itertools.count()
+        self.__size = 0
+
+    def __len__(self):
+        return self.__size
+
+    def push(self, url: str, depth: int, priority: float = None):
+        """
+        Добавляет ссылку в очередь
+        :param url: Ссылка
+        :param depth: Глубина (количество переходов от начальных ссылок)
+        :param priority: Приоритет, меньше - раньше. По умолчанию равен глубине (обход в ширину).
+        """
+        host = get_host(url)
+        item = (depth if priority is None else priority, next(self.__counter), depth, url)
+        heapq.heappush(self.__queues.setdefault(host, []), item)
+        self.__size += 1
+
+    def pop(self, now: float):
+        """
+        Выдает ссылку с наименьшим приоритетом среди хостов, к которым сейчас можно выполнить запрос.
+        Хост ссылки считается занятым до вызова release.
+        :param now: Текущее время
+        :return: (ссылка, глубина) или None
+        """
+        best_host = None
+        for host, queue in self.__queues.items():
+            if not self.__host_ready(host, now):
+                continue
+            if best_host is None or queue[0] < self.__queues[best_host][0]:
+                best_host = host
+
+        if best_host is None:
+            return None
+
+        queue = self.__queues[best_host]
+        _, _, depth, url = heapq.heappop(queue)
+        if not queue:
+            del self.__queues[best_host]
+        self.__size -= 1
+
+        self.__active[best_host] = self.__active.get(best_host, 0) + 1
+        self.__ready_at[best_host] = now + self.__host_delay
+        return url, depth
+
+    def release(self, url: str):
+        """
+        Освобождает хост ссылки после завершения запроса
+        :param url: Ссылка
+        """
+        host = get_host(url)
+        self.__active[host] -= 1
+        if not self.__active[host]:
+            del self.__active[host]
+
+    def wait_time(self, now: float) -> float:
+        """
+        Возвращает время до момента, когда освободится хост по задержке между запросами
+        :param now: Текущее время
+        :return: Время в секундах или None, если нужно дождаться завершения запросов
+        """
+        times = [self.__ready_at.get(host, now) - now for host in self.__queues
+                 if self.__active.get(host, 0) < self.__host_concurrency]
+        return max(0.0, min(times)) if times else None
+
+    def __host_ready(self, host: str, now: float) -> bool:
+        """
+        Можно ли сейчас выполнить запрос к хосту
+        :param host: Хост
+        :param now: Текущее время
+        :return: Можно
+        """
+        return self.__active.get(host, 0) < self.__host_concurrency and self.__ready_at.get(host, now) <= now
+
+
+class Crawler:
+    """
+    Обходит сайты в ширину на заданную глубину, собирая ссылки.
+    Запросы выполняются несколькими параллельными обработчиками с учетом ограничений по хостам.
+    """
+    def __init__(self, link_search, depth: int = DEFAULT_CRAWL_DEPTH, concurrency: int = DEFAULT_CONCURRENCY,
+                 host_delay: float = DEFAULT_HOST_DELAY, host_concurrency: int = DEFAULT_HOST_CONCURRENCY,
+                 links_per_page: int = DEFAULT_LINK_LIMIT, priority=None, checkpoint: CrawlCheckpoint = None):
+        """
+        :param link_search: LinkSearch, через который загружаются страницы
+        :param depth: Глубина обхода (1 - загружаются только начальные страницы)
+        :param concurrency: Максимальное количество одновременных запросов
+        :param host_delay: Минимальный интервал между запросами к одному хосту, в секундах
+        :param host_concurrency: Максимальное количество одновременных запросов к одному хосту
+        :param links_per_page: Максимальное количество ссылок, получаемых с одной страницы
+        :param priority: Функция priority(url, depth) -> число, определяет порядок обхода (меньше - раньше).
+                         По умолчанию обход в ширину.
+        :param checkpoint: Хранилище состояния обхода. Если задано, состояние сохраняется после загрузки каждой
+                           страницы, а сохраненное ранее состояние восстанавливается перед обходом.
+        """
+        if not isinstance(concurrency, int) or concurrency < 1:
+            raise ValueError('Количество одновременных запросов должно быть целым положительным числом.')
+
+        self.__link_search = link_search
+        self.__depth = depth
+        self.__concurrency = concurrency
+        self.__host_delay = host_delay
+        self.__host_concurrency = host_concurrency
+        self.__links_per_page = links_per_page
+        self.__priority = priority
+        self.__checkpoint = checkpoint
+
+    def crawl(self, urls: list, link_count: int) -> list:
+        """
+        Обходит сайты, начиная с переданных ссылок.
+        Если задано хранилище состояния, обход продолжается с места остановки.
+        Можно вызывать и из асинхронного кода (см. run_sync).
+        :param urls: Начальные ссылки
+        :param link_count: Количество ссылок в результате
+        :return: Ссылки (начальные и найденные при обходе), без повторов
+        """
+        if not link_count or link_count < 0 or not isinstance(link_count, int):
+            return []
+
+        return run_sync(self.__crawl(urls, link_count))
+
+    async def __crawl(self, urls: list, link_count: int) -> list:
+        """
+        Обход сайтов
+        :param urls: Начальные ссылки
+        :param link_count: Количество ссылок в результате
+        :return: Ссылки
+        """
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=self.__concurrency)
+        frontier = Frontier(self.__host_delay, self.__host_concurrency)
+        changed = asyncio.Event()
+
+        links = []
+        found_links = UrlIndex(self.__link_search.url_index_capacity)
+        visited_links = UrlIndex(self.__link_search.url_index_capacity)
+        active = 0
+
+        # Новые ссылки и страницы для сохранения в хранилище состояния
+        new_links = []
+        new_pages = []
+
+        def add_link(link: str, depth: int):
+            if found_links.add(link):
+                links.append(link)
+                new_links.append(link)
+            if depth < self.__depth and visited_links.add(link):
+                priority = self.__priority(link, depth) if self.__priority else depth
+                frontier.push(link, depth, priority)
+                new_pages.append((link, depth, priority))
+
+        def save(done_url: str = None):
+            if self.__checkpoint is not None:
+                self.__checkpoint.save(new_links, new_pages, done_url)
+            new_links.clear()
+            new_pages.clear()
+
+        def get_links(url: str) -> list:
+            return self.__link_search.get_site_links(url, link_limit=self.__links_per_page)
+
+        async def worker():
+            nonlocal active
+            while len(links) < link_count:
+                item = frontier.pop(loop.time())
+                if item is None:
+                    if not len(frontier) and not active:
+                        break
+
+                    # Ждем освобождения хоста или появления новых ссылок
+                    changed.clear()
+                    try:
+                        await asyncio.wait_for(changed.wait(), frontier.wait_time(loop.time()))
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                url, depth = item
+                active += 1
+                try:
+                    site_links = await loop.run_in_executor(executor, get_links, url)
+                finally:
+                    active -= 1
+                    frontier.release(url)
+
+                for link in site_links:
+                    add_link(link, depth + 1)
+                save(url)
+                changed.set()
+
+        # Восстанавливаем сохраненное состояние: найденные ссылки, загруженные страницы и очередь
+        if self.__checkpoint is not None:
+            for link in self.__checkpoint.get_links():
+                found_links.add(link)
+                links.append(link)
+            for url in self.__checkpoint.iter_pages():
+                visited_links.add(url)
+            for url, depth, priority in self.__checkpoint.get_pending():
+                frontier.push(url, depth, priority)
+
+        for url in urls:
+            add_link(url, 0)
+        save()
+
+        try:
+            await asyncio.gather(*[worker() for _ in range(self.__concurrency)])
+        finally:
+            executor.shutdown(wait=False)
+        return links[:link_count]
@@ -0,0 +1,146 @@
+"""
+Потоковое извлечение ссылок из HTML без построения дерева документа
+"""
+
+__author__ = 'Игнатьев И.В.'
+
+from html.parser import HTMLParser
+from urllib.parse import urlparse
+
+
+class LinkExtractor(HTMLParser):
+    """
+    Извлекает ссылки из тегов <a> по мере поступления HTML.
+    HTML можно передавать частями. Разбор прекращается, как только найдено нужное количество ссылок.
+    """
+    def __init__(self, link_class: str = None, link_limit: int = None, prepare=None):
+        """
+        :param link_class: CSS-класс, указанный в ссылке
+        :param link_limit: Максимальное количество ссылок. Если не задано - без ограничения.
+        :param prepare: Функция подготовки ссылки prepare(href) -> ссылка или None (ссылка пропускается)
+        """
+        super().__init__(convert_charrefs=True)
+        self.__link_class = link_class
+        self.__link_limit = link_limit
+        self.__prepare = prepare
+        self.__links = []
+        self.__count = 0
+
+    @property
+    def done(self) -> bool:
+        """
+        Найдено ли нужное количество ссылок
+        :return: Разбор завершен
+        """
+        return self.__link_limit is not None and self.__count >= self.__link_limit
+
+    def feed_links(self, chunk: str) -> list:
+        """
+        Разбирает очередную часть HTML
+        :param chunk: Часть HTML
+        :return: Ссылки, найденные в этой части
+        """
+        if not self.done:
+            try:
+                self.feed(chunk)
+            except _LinkLimitReached:
+                pass
+        return self.__pop_links()
+
+    def close_links(self) -> list:
+        """
+        Завершает разбор (обрабатывает остаток HTML, не завершенный в последней части)
+        :return: Ссылки, найденные в остатке
+        """
+        if not self.done:
+            try:
+                self.close()
+            except _LinkLimitReached:
+                pass
+        return self.__pop_links()
+
+    def handle_starttag(self, tag, attrs):
+        if tag != 'a':
+            return
+
+        href = None
+        classes = None
+        for name, value in attrs:
+            if name == 'href':
+                href = value or ''
+            elif name == 'class':
+                classes = (value or '').split()
+
+        if href is None:
+            return
+        if self.__link_class is not None and self.__link_class not in (classes or []):
+            return
+
+        link = self.__prepare(href) if self.__prepare else href
+        if not link:
+            return
+
+        self.__links.append(link)
+        self.__count += 1
+        if self.done:
+            raise _LinkLimitReached()
+
+    def __pop_links(self) -> list:
+        """
+        Возвращает накопленные ссылки и очищает список
+        :return: Ссылки
+        """
+        links = self.__links
+        self.__links = []
+        return links
+
+
+def prepare_link(link, opener_scheme, opener_netloc):
+    """
+    Подготавливает ссылку
+    :param link: Ссылка
+    :param opener_scheme: Scheme сайта-опенеа (для преобразования относительной ссылки в абсолютную)
+    :param opener_netloc: Netloc сайта-опенера (для преобразования относительной ссылки в абсолютную)
+    :return: Откорректированная валидная ссылка
+    """
+    parsed_link = urlparse(link)
+
+    if not (parsed_link.netloc or parsed_link.path):
+        return None
+
+    # Относительные ссылки преобразуем к абсолютным
+    abs_link_created = False
+    if not parsed_link.scheme and not parsed_link.netloc:
+        abs_link_created = True
+        link = (f'{opener_scheme}://' if opener_scheme else '') + f'{opener_netloc}/{link}'
+
+    if link[:2] == '//':
+        link = link[2:]
+
+    # Добавляем схему по-умолчанию, если ее нет
+    if not parsed_link.scheme and not abs_link_created:
+        link = 'http://' + link
+
+    return link
+
+
+def extract_links(html: str, url: str, link_class: str = None, link_limit: int = None) -> list:
+    """
+    Извлекает подготовленные ссылки из HTML страницы.
+    Функция уровня модуля, чтобы ее можно было выполнять в другом процессе.
+    :param html: HTML
+    :param url: URL страницы (для преобразования относительных ссылок в абсолютные)
+    :param link_class: CSS-класс, указанный в ссылке
+    :param link_limit: Максимальное количество ссылок
+    :return: Ссылки
+    """
+    parsed_url = urlparse(url)
+    extractor = LinkExtractor(link_class, link_limit,
+                              lambda href: prepare_link(href, parsed_url.scheme, parsed_url.netloc))
+    return extractor.feed_links(html) + extractor.close_links()
+
+
+class _LinkLimitReached(Exception):
+    """
+    Прерывает разбор после достижения лимита ссылок
+    """
@@ -5,26 +5,70 @@
 
 __author__ = 'Игнатьев И.В.'
 
-import random
+import functools
+import time
 from urllib.parse import urlparse
 
 import requests
-from bs4 import BeautifulSoup
-from fake_useragent import UserAgent
 
-from .constants import YANDEX_SEARCH_PARAMS, DEFAULT_LINK_LIMIT
+from .async_fetch import AsyncLinkFetcher
+from .batch import BatchSearch
+from .cache import CacheEntry, ResponseCache
+from .checkpoint import CrawlCheckpoint
+from .constants import YANDEX_SEARCH_PARAMS, DEFAULT_LINK_LIMIT, DEFAULT_CONCURRENCY, HTML_CHUNK_SIZE, \
+    DEFAULT_MAX_BYTES, DEFAULT_CRAWL_DEPTH, DEFAULT_CRAWL_SEED_COUNT
+from .crawler import Crawler
+from .link_parser import LinkExtractor, prepare_link
+from .metrics import Metrics, RequestTrace
+from .parse_pool import ParsePool
+from .policy import FetchPolicy
+from .proxies import ProxyManager
+from .rate_limit import HostRateLimiter
+from .sessions import SessionPool
+from .streaming import BodyReader
+from .url_index import get_host, UrlIndex
+from .user_agents import UserAgentPool
 
 
 class LinkSearch:
     """
     Возвращает ссылки на сайты
     """
-    def __init__(self, proxies: list = None):
+    def __init__(self, proxies: list = None, concurrency: int = DEFAULT_CONCURRENCY, sessions: SessionPool = None,
+                 cache: ResponseCache = None, max_bytes: int = DEFAULT_MAX_BYTES, url_index_capacity: int = None,
+                 parse_processes: int = None, policy: FetchPolicy = None, search_params: dict = None,
+                 rate_limiter: HostRateLimiter = None, metrics: Metrics = None, user_agents: UserAgentPool = None):
         """
         :param proxies: Список proxy в формате 'login:passsword@host:port'
+        :param concurrency: Максимальное количество одновременных запросов при глубоком поиске
+        :param sessions: Пул HTTP-сессий. По умолчанию создается новый.
+        :param cache: Кэш ответов сайтов (например, FileResponseCache). По умолчанию не используется.
+        :param max_bytes: Максимальное количество байт, загружаемое с одной страницы
+        :param url_index_capacity: Ожидаемое количество ссылок при поиске. Если задано, для исключения дублей
+                                   используется фильтр Блума фиксированного размера, иначе - множество ссылок.
+        :param parse_processes: Количество процессов для разбора страниц. Если задано, страницы разбираются
+                                в пуле процессов параллельно с загрузкой, иначе - в потоке загрузки.
+        :param policy: Политика выполнения запросов (таймауты, повторы, ограничение времени поиска).
+                       По умолчанию FetchPolicy с параметрами по умолчанию.
+        :param search_params: Параметры поисковой системы ('url', 'link_class'), по умолчанию - Yandex
+        :param rate_limiter: Ограничение частоты запросов к хостам. По умолчанию HostRateLimiter
+                             с ограничениями DEFAULT_HOST_RATES (для поисковой системы).
+        :param metrics: Реестр метрик загрузки страниц. По умолчанию метрики не собираются.
+        :param user_agents: Набор User-Agent. По умолчанию UserAgentPool (загружается при первом запросе).
         """
-        self.user_agents = UserAgent()
+        self.user_agents = user_agents if user_agents is not None else UserAgentPool()
         self.proxies = proxies
+        self.proxy_manager = ProxyManager(proxies) if proxies else None
+        self.sessions = sessions if sessions is not None else SessionPool()
+        self.cache = cache
+        self.max_bytes = max_bytes
+        self.url_index_capacity = url_index_capacity
+        self.parse_pool = ParsePool(parse_processes) if parse_processes else None
+        self.policy = policy if policy is not None else FetchPolicy()
+        self.search_params = search_params if search_params is not None else YANDEX_SEARCH_PARAMS
+        self.rate_limiter = rate_limiter if rate_limiter is not None else HostRateLimiter()
+        self.metrics = metrics
+        self.fetcher = AsyncLinkFetcher(self.get_site_links, concurrency)
 
     def get_search_links(self, search_string: str, link_count: int = None or DEFAULT_LINK_LIMIT, deep=False) -> list:
         """
@@ -33,35 +77,154 @@ class LinkSearch:
         :param search_string: Строка поиска
         :param link_count: Количество ссылок в результате
         :param deep: Глубокий поиск (переходить на сайты, являющиеся результатом поиска, и искать ссылки на них)
-        :return: Ссылки
+        :return: Ссылки, найденные до истечения времени поиска (policy.search_timeout)
         """
         if not search_string or not link_count or link_count < 0 or not isinstance(link_count, int):
             return []
 
+        # Обычный поиск не требует параллельной загрузки сайтов
+        if not deep:
+            return list(self.iter_search_links(search_string, link_count))
+
+        # Время поиска ограничено политикой запросов
+        deadline = self.policy.get_deadline()
+        fetcher = AsyncLinkFetcher(functools.partial(self.get_site_links, deadline=deadline), self.fetcher.concurrency)
+
         search_page = 0
         links = []
 
+        # Найденные ссылки и загруженные сайты (для исключения дублей)
+        found_links = self.__create_url_index()
+        visited_links = self.__create_url_index()
+
+        def add_site_links(search_link, site_links):
+            # Ссылки добавляются по мере загрузки сайтов, после набора нужного количества загрузка прекращается
+            for link in [search_link] + site_links:
+                if found_links.add(link):
+                    links.append(link)
+            return len(links) >= link_count
+
         while len(links) < link_count:
             # Получаем одну страницу ссылок от Yandex
-            search_links = self.get_site_links(YANDEX_SEARCH_PARAMS['url'].format(search_string, search_page),
-                                               link_class=YANDEX_SEARCH_PARAMS['link_class'])
+            search_links = self.get_site_links(self.__search_page_url(search_string, search_page),
+                                               link_class=self.search_params['link_class'], deadline=deadline)
 
+            # Загружаем только сайты, которые еще не загружались
+            search_links = [search_link for search_link in search_links if visited_links.add(search_link)]
             if not search_links:
                 break
 
-            # При глубоком поиске получаем ссылки с найденных сайтов
-            if deep:
-                for search_link in search_links:
-                    links.append(search_link)
-                    if len(links) > link_count:
-                        break
-                    links += self.get_site_links(search_link)
-            else:
-                links += search_links
+            # Параллельно получаем ссылки с найденных сайтов
+            fetcher.collect(search_links, stop=add_site_links, deadline=deadline)
 
             search_page += 1
         return links[:link_count]
 
+    def iter_batch_search_links(self, search_strings, link_count: int = DEFAULT_LINK_LIMIT, deep=False,
+                                rate: float = None):
+        """
+        Генератор результатов поиска по нескольким строкам поиска, выполняемого одновременно (см. BatchSearch).
+        Возвращает пары (строка поиска, ссылки) по мере завершения поисков.
+        :param search_strings: Строки поиска
+        :param link_count: Количество ссылок в результате каждого поиска
+        :param deep: Глубокий поиск
+        :param rate: Максимальное количество запросов в секунду для всех поисков. None - без ограничения.
+        """
+        return BatchSearch(self, self.fetcher.concurrency, rate).iter_search_links(search_strings, link_count, deep)
+
+    def crawl(self, search_string: str, link_count: int = DEFAULT_LINK_LIMIT, depth: int = DEFAULT_CRAWL_DEPTH,
+              checkpoint: CrawlCheckpoint = None, seed_count: int = DEFAULT_CRAWL_SEED_COUNT, **crawler_params) -> list:
+        """
+        Возвращает ссылки, найденные при обходе сайтов из результатов поиска в Yandex на заданную глубину.
+        :param search_string: Строка поиска
+        :param link_count: Количество ссылок в результате
+        :param depth: Глубина обхода (1 - аналог глубокого поиска)
+        :param checkpoint: Хранилище состояния обхода. Если в нем есть сохраненное состояние, обход продолжается
+                           с места остановки без повторного поиска и повторной загрузки страниц.
+                           Если состояние сохранено для другой строки поиска или других параметров обхода,
+                           возбуждается ValueError.
+        :param seed_count: Количество результатов поиска, с которых начинается обход (не больше link_count).
+                           Остальные ссылки находятся при обходе.
+        :param crawler_params: Параметры обхода (host_delay, host_concurrency, links_per_page, priority), см. Crawler
+        :return: Ссылки
+        """
+        if not search_string or not link_count or link_count < 0 or not isinstance(link_count, int):
+            return []
+
+        # При продолжении обхода результаты поиска уже сохранены в хранилище
+        search_links = []
+        if checkpoint is not None:
+            checkpoint.check_params({'search_string': search_string, 'depth': depth, 'seed_count': seed_count,
+                                     'links_per_page': crawler_params.get('links_per_page', DEFAULT_LINK_LIMIT)})
+        if checkpoint is None or not checkpoint.started:
+            search_links = list(self.iter_search_links(search_string, min(seed_count, link_count)))
+
+        crawler = Crawler(self, depth, self.fetcher.concurrency, checkpoint=checkpoint, **crawler_params)
+        return crawler.crawl(search_links, link_count)
+
+    def iter_search_links(self, search_string: str, link_count: int = DEFAULT_LINK_LIMIT, deep=False):
+        """
+        Генератор ссылок результатов поиска в Yandex.
+        Ссылки возвращаются по мере разбора страниц. Сайты и следующие страницы поиска загружаются только тогда,
+        когда запрошена следующая ссылка, поэтому после остановки генератора запросы не выполняются.
+        Повторяющиеся ссылки пропускаются.
+        :param search_string: Строка поиска
+        :param link_count: Максимальное количество ссылок
+        :param deep: Глубокий поиск (переходить на сайты, являющиеся результатом поиска, и искать ссылки на них)
+        """
+        if not search_string or not link_count or link_count < 0 or not isinstance(link_count, int):
+            return
+
+        deadline = self.policy.get_deadline()
+        found_links = self.__create_url_index()
+        visited_links = self.__create_url_index()
+
+        search_page = 0
+        count = 0
+        while True:
+            # Если на странице поиска нет новых сайтов, следующие страницы не запрашиваем
+            found = False
+            for search_link in self.iter_site_links(self.__search_page_url(search_string, search_page),
+                                                    link_class=self.search_params['link_class'], deadline=deadline):
+                if not visited_links.add(search_link):
+                    continue
+                found = True
+
+                if found_links.add(search_link):
+                    yield search_link
+                    count += 1
+                    if count == link_count:
+                        return
+
+                if deep:
+                    for site_link in self.iter_site_links(search_link, deadline=deadline):
+                        if not found_links.add(site_link):
+                            continue
+                        yield site_link
+                        count += 1
+                        if count == link_count:
+                            return
+
+            if not found:
+                break
+            search_page += 1
+
+    def __create_url_index(self) -> UrlIndex:
+        """
+        Создает индекс ссылок для исключения дублей
+        :return: Индекс
+        """
+        return UrlIndex(self.url_index_capacity)
+
+    def __search_page_url(self, search_string: str, search_page: int) -> str:
+        """
+        Возвращает адрес страницы результатов поиска
+        :param search_string: Строка поиска
+        :param search_page: Номер страницы
+        :return: URL
+        """
+        return self.search_params['url'].format(search_string, search_page)
+
     @staticmethod
     def prepare_link(link, opener_scheme, opener_netloc):
         """
@@ -71,67 +234,235 @@ class LinkSearch:
         :param opener_netloc: Netloc сайта-опенера (для преобразования относительной ссылки в абсолютную)
         :return: Откорректированная валидная ссылка
         """
-        parsed_link = urlparse(link)
-
-        if not (parsed_link.netloc or parsed_link.path):
-            return None
-
-        # Относительные ссылки преобразуем к абсолютным
-        abs_link_created = False
-        if not parsed_link.scheme and not parsed_link.netloc:
-            abs_link_created = True
-            link = (f'{opener_scheme}://' if opener_scheme else '') + f'{opener_netloc}/{link}'
+        return prepare_link(link, opener_scheme, opener_netloc)
 
-        if link[:2] == '//':
-            link = link[2:]
-
-        # Добавляем схему по-умолчанию, если ее нет
-        if not parsed_link.scheme and not abs_link_created:
-            link = 'http://' + link
-
-        return link
-
-    def get_site_links(self, url: str, link_class=None, link_limit=DEFAULT_LINK_LIMIT) -> list:
+    def get_site_links(self, url: str, link_class=None, link_limit=DEFAULT_LINK_LIMIT, deadline: float = None) -> list:
         """
         Возвращает список ссылок с переданного сайта
         :param url: URL
         :param link_class: CSS-класс, указанный в ссылке
         :param link_limit: Максимальное количество результатов
+        :param deadline: Время (по time.monotonic), после которого загрузка прекращается
         :return: Список ссылок
         """
-        if not url or not link_limit or link_limit < 0 or not isinstance(link_limit, int):
-            return []
+        return list(self.iter_site_links(url, link_class, link_limit, deadline))
 
-        # Выбираем произвольные User-Agent и Proxy
-        html = None
-        user_agent = self.user_agents.random
-        proxies = None
-        if self.proxies:
-            proxy = self.proxies[random.randint(0, len(self.proxies) - 1)]
-            proxies = {'http': f'http://{proxy}', 'https': f'http://{proxy}'}
+    def iter_site_links(self, url: str, link_class=None, link_limit=DEFAULT_LINK_LIMIT, deadline: float = None):
+        """
+        Генератор ссылок с переданного сайта. Ссылки возвращаются по мере разбора страницы.
+        :param url: URL
+        :param link_class: CSS-класс, указанный в ссылке
+        :param link_limit: Максимальное количество результатов
+        :param deadline: Время (по time.monotonic), после которого загрузка прекращается
+        """
+        if not url or not link_limit or link_limit < 0 or not isinstance(link_limit, int):
+            return
 
-        headers = {'User-Agent': user_agent}
+        trace = RequestTrace(url)
+        start_time = time.perf_counter()
         try:
-            response = requests.get(url, headers=headers, proxies=proxies)
-            html = response.text
-        except:
-            pass
+            for link in self.__iter_links(url, link_class, link_limit, deadline, trace):
+                trace.links += 1
+                yield link
+        finally:
+            if self.metrics is not None:
+                trace.total_time = time.perf_counter() - start_time
+                self.metrics.record(trace)
 
-        if not html:
-            return []
+    def __iter_links(self, url: str, link_class, link_limit: int, deadline: float, trace: RequestTrace):
+        """
+        Генератор ссылок с переданного сайта (см. iter_site_links)
+        :param trace: Сведения о загрузке страницы для метрик
+        """
+        # Страница загружается целиком (в пределах max_bytes) и разбирается в пуле процессов
+        if self.parse_pool is not None:
+            chunks = self.__iter_html(url, deadline, trace)
+            try:
+                html = ''.join(chunks)
+            finally:
+                chunks.close()
+            if html:
+                parse_start = time.perf_counter()
+                links = self.parse_pool.extract_links(html, url, link_class, link_limit)
+                trace.parse_time += time.perf_counter() - parse_start
+                yield from links
+            return
 
-        links = []
+        # Разбираем страницу по мере загрузки, пока не найдем нужное количество ссылок.
+        # После остановки генератора соединение закрывается, оставшаяся часть страницы не загружается.
         parsed_url = urlparse(url)
-        soup = BeautifulSoup(html, 'lxml')
-        for tag in soup.find_all('a', href=True):
-            if link_class is not None and link_class not in (tag.get('class') or []):
-                continue
+        extractor = LinkExtractor(link_class, link_limit,
+                                  lambda href: self.prepare_link(href, parsed_url.scheme, parsed_url.netloc))
+        chunks = self.__iter_html(url, deadline, trace)
+        try:
+            for chunk in chunks:
+                for start in range(0, len(chunk), HTML_CHUNK_SIZE):
+                    parse_start = time.perf_counter()
+                    links = extractor.feed_links(chunk[start:start + HTML_CHUNK_SIZE])
+                    trace.parse_time += time.perf_counter() - parse_start
+                    yield from links
+                    if extractor.done:
+                        return
+
+            parse_start = time.perf_counter()
+            links = extractor.close_links()
+            trace.parse_time += time.perf_counter() - parse_start
+            yield from links
+        finally:
+            chunks.close()
+
+    def __iter_html(self, url: str, deadline: float, trace: RequestTrace):
+        """
+        Генератор частей страницы. Страница загружается частями, не более max_bytes байт.
+        Если задан кэш, использует его: актуальный ответ возвращается без запроса к сайту,
+        устаревший проверяется условным запросом.
+        :param url: URL
+        :param deadline: Время (по time.monotonic), после которого загрузка прекращается
+        :param trace: Сведения о загрузке страницы для метрик
+        """
+        entry = self.cache.get(url) if self.cache is not None else None
+        if entry is not None and entry.is_fresh(self.cache.ttl):
+            trace.cache = 'fresh'
+            yield entry.body
+            return
+
+        # Выбираем произвольный User-Agent
+        headers = {'User-Agent': self.user_agents.random}
+        if entry is not None:
+            headers.update(entry.validators())
+
+        response, session = self.__request(url, headers, deadline, trace)
+        if response is None:
+            return
+
+        try:
+            # Страница не изменилась
+            if entry is not None and response.status_code == 304:
+                self.cache.touch(url)
+                trace.cache = 'revalidated'
+                yield entry.body
+                return
+
+            reader = BodyReader(response, self.max_bytes, deadline=deadline)
+            chunks = iter(reader)
+            body = [] if self.cache is not None and response.ok else None
+            download_start = time.perf_counter()
+            try:
+                for chunk in chunks:
+                    trace.download_time += time.perf_counter() - download_start
+                    if body is not None:
+                        body.append(chunk)
+                    yield chunk
+                    download_start = time.perf_counter()
+            finally:
+                # Для сохранения в кэш страница дочитывается, даже если ссылки уже найдены
+                if body is not None:
+                    download_start = time.perf_counter()
+                    body.extend(chunks)
+                    trace.download_time += time.perf_counter() - download_start
+                    if reader.complete and body:
+                        self.cache.set(url, CacheEntry(''.join(body), response.headers.get('ETag'),
+                                                       response.headers.get('Last-Modified')))
+                trace.received = reader.received
+        finally:
+            # Сессия освобождается после закрытия ответа: до этого пул ее не закроет
+            response.close()
+            self.sessions.release(session)
+
+    def __request(self, url: str, headers: dict, deadline: float, trace: RequestTrace):
+        """
+        Выполняет запрос согласно политике: с таймаутами, повторами при временных ошибках,
+        без запросов к хосту, для которого разомкнут автоматический выключатель, и без превышения частоты запросов.
+        :param url: URL
+        :param headers: Заголовки
+        :param deadline: Время (по time.monotonic), после которого запросы не выполняются
+        :param trace: Сведения о загрузке страницы для метрик
+        :return: (ответ (stream=True), сессия) или (None, None). Сессию нужно освободить после закрытия ответа.
+        """
+        breaker = self.policy.get_breaker(get_host(url))
+        for attempt in range(self.policy.retries + 1):
+            if attempt:
+                delay = self.policy.get_retry_delay(attempt - 1)
+                if deadline is not None:
+                    delay = min(delay, max(0.0, deadline - time.monotonic()))
+                time.sleep(delay)
+
+            timeout = self.policy.get_timeout(deadline)
+            if timeout is None:
+                trace.errors.append('deadline')
+                return None, None
+            if not breaker.allow():
+                trace.errors.append('circuit_open')
+                return None, None
+
+            # Ждем возможности выполнить запрос к хосту без превышения допустимой частоты
+            wait_start = time.perf_counter()
+            allowed = self.rate_limiter.acquire(url, deadline)
+            trace.wait_time += time.perf_counter() - wait_start
+            if not allowed:
+                # Запрос не выполняется, пробный запрос выключателя остается свободным
+                breaker.release()
+                trace.errors.append('rate_limited')
+                return None, None
+            if deadline is not None:
+                timeout = self.policy.get_timeout(deadline)
+                if timeout is None:
+                    breaker.release()
+                    trace.errors.append('deadline')
+                    return None, None
 
-            link = self.prepare_link(tag['href'], parsed_url.scheme, parsed_url.netloc)
-            if not link:
+            # Выбираем proxy с учетом работоспособности и скорости
+            proxy = None
+            proxies = None
+            if self.proxy_manager is not None:
+                proxy = self.proxy_manager.choose()
+                proxies = {'http': f'http://{proxy}', 'https': f'http://{proxy}'}
+
+            # При stream=True запрос завершается после получения заголовков ответа
+            trace.attempts += 1
+            start_time = time.monotonic()
+            session = self.sessions.get(proxy)
+            try:
+                response = session.get(url, headers=headers, proxies=proxies, timeout=timeout, stream=True)
+            except requests.RequestException as error:
+                self.sessions.release(session)
+                trace.headers_time += time.monotonic() - start_time
+                trace.errors.append(type(error).__name__)
+                if proxy is not None:
+                    self.proxy_manager.report_failure(proxy)
+                    # Данные для входа в proxy в метрики не попадают
+                    trace.proxy_failures.append(proxy.rpartition('@')[2])
+                # Ошибки запроса (неверная ссылка и т.п.) не говорят о неработоспособности хоста
+                if not self.policy.is_retryable(error):
+                    breaker.release()
+                    return None, None
+                breaker.record_failure()
                 continue
+            except BaseException:
+                self.sessions.release(session)
+                raise
 
-            links.append(link)
-            if len(links) == link_limit:
-                break
-        return links
+            trace.headers_time += time.monotonic() - start_time
+            trace.status_code = response.status_code
+            if proxy is not None:
+                self.proxy_manager.report_success(proxy, time.monotonic() - start_time)
+
+            if not self.policy.is_retryable(status_code=response.status_code):
+                breaker.record_success()
+                return response, session
+
+            trace.errors.append(f'http_{response.status_code}')
+            breaker.record_failure()
+            if attempt == self.policy.retries:
+                return response, session
+            response.close()
+            self.sessions.release(session)
+        return None, None
+
+    def close(self):
+        """
+        Закрывает открытые соединения
+        """
+        self.sessions.close()
+        if self.parse_pool is not None:
+            self.parse_pool.close()
@@ -0,0 +1,190 @@
+"""
+Метрики загрузки страниц: время по этапам, объем данных, ошибки.
+Выгружаются в текстовом формате Prometheus.
+"""
+
+__author__ = 'Игнатьев И.В.'
+
+import threading
+
+from .constants import METRIC_TIME_BUCKETS, METRIC_LINK_BUCKETS
+
+# Имя метрики -> (тип, описание, границы интервалов гистограммы)
+METRICS = {
+    'link_search_pages_total': ('counter', 'Загруженные страницы', None),
+    'link_search_responses_total': ('counter', 'Ответы сайтов по кодам ответа', None),
+    'link_search_errors_total': ('counter', 'Ошибки запросов по типам', None),
+    'link_search_retries_total': ('counter', 'Повторы запросов', None),
+    'link_search_proxy_failures_total': ('counter', 'Ошибки запросов через proxy', None),
+    'link_search_cache_hits_total': ('counter', 'Страницы из кэша (fresh - без запроса, revalidated - ответ 304)',
+                                     None),
+    'link_search_received_bytes_total': ('counter', 'Загруженные байты тела ответов', None),
+    'link_search_links_total': ('counter', 'Ссылки, полученные со страниц', None),
+    'link_search_wait_seconds': ('histogram', 'Ожидание ограничителя частоты запросов, с', METRIC_TIME_BUCKETS),
+    'link_search_headers_seconds': ('histogram', 'Время до получения заголовков ответа '
+                                                 '(DNS, соединение, TLS, ожидание первого байта), с',
+                                    METRIC_TIME_BUCKETS),
+    'link_search_download_seconds': ('histogram', 'Время загрузки тела ответа, с', METRIC_TIME_BUCKETS),
+    'link_search_parse_seconds': ('histogram', 'Время разбора страницы, с', METRIC_TIME_BUCKETS),
+    'link_search_page_seconds': ('histogram', 'Полное время получения ссылок со страницы, с', METRIC_TIME_BUCKETS),
+    'link_search_page_links': ('histogram', 'Количество ссылок, полученных со страницы', METRIC_LINK_BUCKETS)
+}
+
+
+class RequestTrace:
+    """
+    Сведения о получении ссылок с одной страницы, заполняются по мере загрузки и разбора
+    """
+    def __init__(self, url: str):
+        """
+        :param url: Адрес страницы
+        """
+        self.url = url
+
+        # Количество попыток запроса
+        self.attempts = 0
+
+        # Код последнего ответа (None, если ответ не получен)
+        self.status_code = None
+
+        # Типы ошибок запросов (по попыткам)
+        self.errors = []
+
+        # Proxy, запросы через которые завершились ошибкой
+        self.proxy_failures = []
+
+        # Страница взята из кэша: 'fresh', 'revalidated' или None
+        self.cache = None
+
+        # Время этапов в секундах
+        self.wait_time = 0.0
+        self.headers_time = 0.0
+        self.download_time = 0.0
+        self.parse_time = 0.0
+        self.total_time = 0.0
+
+        # Загружено байт, получено ссылок
+        self.received = 0
+        self.links = 0
+
+
+class Metrics:
+    """
+    Реестр метрик. Собирает сведения о загрузке страниц (RequestTrace) в счетчики и гистограммы
+    и передает их подписчикам. Можно использовать одновременно из нескольких потоков.
+    """
+    def __init__(self):
+        # Имя метрики -> метки (кортеж пар) -> значение счетчика или [количества по интервалам, сумма, количество]
+        self.__values = {name: {} for name in METRICS}
+        self.__listeners = []
+        self.__lock = threading.Lock()
+
+    def add_listener(self, callback):
+        """
+        Добавляет подписчика
+        :param callback: Функция callback(trace: RequestTrace), вызывается после получения ссылок с каждой страницы
+        """
+        self.__listeners.append(callback)
+
+    def record(self, trace: RequestTrace):
+        """
+        Учитывает получение ссылок со страницы
+        :param trace: Сведения о странице
+        """
+        with self.__lock:
+            self.__inc('link_search_pages_total')
+            if trace.status_code is not None:
+                self.__inc('link_search_responses_total', code=str(trace.status_code))
+            for error in trace.errors:
+                self.__inc('link_search_errors_total', error=error)
+            if trace.attempts > 1:
+                self.__inc('link_search_retries_total', trace.attempts - 1)
+            for proxy in trace.proxy_failures:
+                self.__inc('link_search_proxy_failures_total', proxy=proxy)
+            if trace.cache is not None:
+                self.__inc('link_search_cache_hits_total', result=trace.cache)
+            self.__inc('link_search_received_bytes_total', trace.received)
+            self.__inc('link_search_links_total', trace.links)
+
+            if trace.attempts:
+                self.__observe('link_search_wait_seconds', trace.wait_time)
+                self.__observe('link_search_headers_seconds', trace.headers_time)
+            if trace.status_code is not None:
+                self.__observe('link_search_download_seconds', trace.download_time)
+            self.__observe('link_search_parse_seconds', trace.parse_time)
+            self.__observe('link_search_page_seconds', trace.total_time)
+            self.__observe('link_search_page_links', trace.links)
+
+        for callback in self.__listeners:
+            callback(trace)
+
+    def get(self, name: str, **labels):
+        """
+        Возвращает значение счетчика или количество наблюдений гистограммы
+        :param name: Имя метрики
+        :param labels: Метки
+        :return: Значение
+        """
+        with self.__lock:
+            value = self.__values[name].get(tuple(sorted(labels.items())))
+        if value is None:
+            return 0
+        return value[2] if METRICS[name][0] == 'histogram' else value
+
+    def to_prometheus(self) -> str:
+        """
+        Выгружает метрики в текстовом формате Prometheus
+        :return: Текст
+        """
+        lines = []
+        with self.__lock:
+            for name, (metric_type, description, buckets) in METRICS.items():
+                lines.append(f'# HELP {name} {description}')
+                lines.append(f'# TYPE {name} {metric_type}')
+                for labels, value in sorted(self.__values[name].items()):
+                    if metric_type == 'counter':
+                        lines.append(f'{name}{self.__format_labels(labels)} {value}')
+                        continue
+
+                    counts, total, count = value
+                    cumulative = 0
+                    for bound, bucket_count in zip(buckets, counts):
+                        cumulative += bucket_count
+                        lines.append(f'{name}_bucket{self.__format_labels(labels + (("le", str(bound)),))} '
+                                     f'{cumulative}')
+                    lines.append(f'{name}_bucket{self.__format_labels(labels + (("le", "+Inf"),))} {count}')
+                    lines.append(f'{name}_sum{self.__format_labels(labels)} {total}')
+                    lines.append(f'{name}_count{self.__format_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+    def __inc(self, name: str, value=1, **labels):
+        """
+        Увеличивает счетчик
+        """
+        values = self.__values[name]
+        key = tuple(sorted(labels.items()))
+        values[key] = values.get(key, 0) + value
+
+    def __observe(self, name: str, value, **labels):
+        """
+        Добавляет наблюдение в гистограмму
+        """
+        buckets = METRICS[name][2]
+        key = tuple(sorted(labels.items()))
+        counts, total, count = self.__values[name].get(key) or ([0] * len(buckets), 0, 0)
+        for idx, bound in enumerate(buckets):
+            if value <= bound:
+                counts[idx] += 1
+                break
+        self.__values[name][key] = (counts, total + value, count + 1)
+
+    @staticmethod
+    def __format_labels(labels: tuple) -> str:
+        """
+        Форматирует метки метрики
+        """
+        if not labels:
+            return ''
+        values = ','.join('{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"')
+                                           .replace('\n', '\\n')) for key, value in labels)
+        return '{' + values + '}'
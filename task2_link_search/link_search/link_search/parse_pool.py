@@ -0,0 +1,39 @@
+"""
+Разбор страниц в пуле процессов
+"""
+
+__author__ = 'Игнатьев И.В.'
+
+from concurrent.futures import ProcessPoolExecutor
+
+from .link_parser import extract_links
+
+
+class ParsePool:
+    """
+    Выполняет извлечение ссылок из HTML в отдельных процессах.
+    Разбор занимает процессор и в одном процессе ограничен GIL; в пуле процессов он выполняется на нескольких ядрах,
+    а потоки, загружающие страницы, в это время продолжают работу.
+    """
+    def __init__(self, processes: int = None):
+        """
+        :param processes: Количество процессов. По умолчанию - количество ядер процессора.
+        """
+        self.__executor = ProcessPoolExecutor(max_workers=processes)
+
+    def extract_links(self, html: str, url: str, link_class: str = None, link_limit: int = None) -> list:
+        """
+        Извлекает ссылки из HTML в одном из процессов пула и ждет результат
+        :param html: HTML
+        :param url: URL страницы
+        :param link_class: CSS-класс, указанный в ссылке
+        :param link_limit: Максимальное количество ссылок
+        :return: Ссылки
+        """
+        return self.__executor.submit(extract_links, html, url, link_class, link_limit).result()
+
+    def close(self):
+        """
+        Завершает процессы пула
+        """
+        self.__executor.shutdown()
@@ -0,0 +1,180 @@
+"""
+Политика выполнения запросов: таймауты, повторы, ограничение времени поиска, автоматический выключатель по хостам
+"""
+
+__author__ = 'Игнатьев И.В.'
+
+import random
+import threading
+import time
+
+import requests
+
+from .constants import DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT, DEFAULT_SEARCH_TIMEOUT, DEFAULT_RETRIES, \
+    DEFAULT_RETRY_BACKOFF, MAX_RETRY_BACKOFF, RETRY_STATUSES, DEFAULT_BREAKER_THRESHOLD, DEFAULT_BREAKER_TIMEOUT
+
+
+class CircuitBreaker:
+    """
+    Автоматический выключатель для хоста.
+    После threshold ошибок подряд запросы к хосту не выполняются reset_timeout секунд.
+    Затем выполняется один пробный запрос: при успехе выключатель закрывается, при ошибке снова размыкается.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, threshold: int = DEFAULT_BREAKER_THRESHOLD, reset_timeout: float = DEFAULT_BREAKER_TIMEOUT):
+        """
+        :param threshold: Количество ошибок подряд, после которого выключатель размыкается
+        :param reset_timeout: Время в секундах, через которое разрешается пробный запрос
+        """
+        self.__threshold = threshold
+        self.__reset_timeout = reset_timeout
+        self.__failures = 0
+        self.__opened_at = None
+        self.__trial = False
+        self.__lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """
+        Возвращает состояние выключателя
+        :return: closed/open/half_open
+        """
+        with self.__lock:
+            return self.__state(time.monotonic())
+
+    def allow(self) -> bool:
+        """
+        Можно ли выполнить запрос
+        :return: Можно
+        """
+        with self.__lock:
+            state = self.__state(time.monotonic())
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self.__trial:
+                self.__trial = True
+                return True
+            return False
+
+    def release(self):
+        """
+        Освобождает пробный запрос, разрешенный allow, если запрос не был выполнен
+        (например, из-за ограничения частоты запросов или времени поиска)
+        """
+        with self.__lock:
+            self.__trial = False
+
+    def record_success(self):
+        """
+        Учитывает успешный запрос
+        """
+        with self.__lock:
+            self.__failures = 0
+            self.__opened_at = None
+            self.__trial = False
+
+    def record_failure(self):
+        """
+        Учитывает неудачный запрос
+        """
+        with self.__lock:
+            self.__failures += 1
+            if self.__trial or self.__failures >= self.__threshold:
+                self.__opened_at = time.monotonic()
+            self.__trial = False
+
+    def __state(self, now: float) -> str:
+        if self.__opened_at is None:
+            return self.CLOSED
+        if now - self.__opened_at < self.__reset_timeout:
+            return self.OPEN
+        return self.HALF_OPEN
+
+
+class FetchPolicy:
+    """
+    Политика выполнения запросов к сайтам
+    """
+    def __init__(self, connect_timeout: float = DEFAULT_CONNECT_TIMEOUT, read_timeout: float = DEFAULT_READ_TIMEOUT,
+                 search_timeout: float = DEFAULT_SEARCH_TIMEOUT, retries: int = DEFAULT_RETRIES,
+                 retry_backoff: float = DEFAULT_RETRY_BACKOFF, max_retry_backoff: float = MAX_RETRY_BACKOFF,
+                 breaker_threshold: int = DEFAULT_BREAKER_THRESHOLD,
+                 breaker_timeout: float = DEFAULT_BREAKER_TIMEOUT):
+        """
+        :param connect_timeout: Таймаут установки соединения, в секундах
+        :param read_timeout: Таймаут ожидания данных от сайта, в секундах
+        :param search_timeout: Максимальное время одного поиска, в секундах. None - без ограничения.
+        :param retries: Количество повторов запроса при временных ошибках
+        :param retry_backoff: Базовая задержка перед повтором, в секундах (удваивается с каждым повтором)
+        :param max_retry_backoff: Максимальная задержка перед повтором, в секундах
+        :param breaker_threshold: Количество ошибок подряд, после которого запросы к хосту приостанавливаются
+        :param breaker_timeout: Время приостановки запросов к хосту, в секундах
+        """
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.search_timeout = search_timeout
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+        self.breaker_threshold = breaker_threshold
+        self.breaker_timeout = breaker_timeout
+
+        self.__breakers = {}
+        self.__lock = threading.Lock()
+        self.__random = random.Random()
+
+    def get_deadline(self) -> float:
+        """
+        Возвращает момент времени (по time.monotonic), до которого должен завершиться поиск
+        :return: Время или None, если время поиска не ограничено
+        """
+        return None if self.search_timeout is None else time.monotonic() + self.search_timeout
+
+    def get_timeout(self, deadline: float = None):
+        """
+        Возвращает таймауты запроса с учетом оставшегося до deadline времени
+        :param deadline: Время окончания поиска
+        :return: (таймаут соединения, таймаут чтения) или None, если время вышло
+        """
+        if deadline is None:
+            return self.connect_timeout, self.read_timeout
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        return min(self.connect_timeout, remaining), min(self.read_timeout, remaining)
+
+    def get_retry_delay(self, attempt: int) -> float:
+        """
+        Возвращает задержку перед повтором запроса (экспоненциальная, со случайным разбросом)
+        :param attempt: Номер повтора, начиная с 0
+        :return: Задержка в секундах
+        """
+        return self.__random.uniform(0, min(self.max_retry_backoff, self.retry_backoff * 2 ** attempt))
+
+    @staticmethod
+    def is_retryable(error: Exception = None, status_code: int = None) -> bool:
+        """
+        Можно ли повторить запрос после ошибки или ответа с кодом status_code
+        :param error: Исключение
+        :param status_code: Код ответа
+        :return: Можно
+        """
+        if error is not None:
+            return isinstance(error, (requests.ConnectionError, requests.Timeout))
+        return status_code in RETRY_STATUSES
+
+    def get_breaker(self, host: str) -> CircuitBreaker:
+        """
+        Возвращает автоматический выключатель для хоста
+        :param host: Хост
+        :return: Выключатель
+        """
+        with self.__lock:
+            breaker = self.__breakers.get(host)
+            if breaker is None:
+                breaker = self.__breakers[host] = CircuitBreaker(self.breaker_threshold, self.breaker_timeout)
+            return breaker
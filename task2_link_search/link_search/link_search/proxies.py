@@ -0,0 +1,135 @@
+"""
+Выбор proxy с учетом их работоспособности и скорости
+"""
+
+__author__ = 'Игнатьев И.В.'
+
+import random
+import threading
+import time
+
+from .constants import DEFAULT_PROXY_COOLDOWN, MAX_PROXY_COOLDOWN, PROXY_LATENCY_SMOOTHING, DEFAULT_PROXY_LATENCY
+
+
+class ProxyStats:
+    """
+    Статистика использования proxy
+    """
+    def __init__(self):
+        # Количество успешных и неудачных запросов
+        self.successes = 0
+        self.failures = 0
+
+        # Неудачных запросов подряд
+        self.consecutive_failures = 0
+
+        # Сглаженное время ответа в секундах
+        self.latency = None
+
+        # Время, до которого proxy не используется после ошибки
+        self.cooldown_until = 0.0
+
+    @property
+    def success_rate(self) -> float:
+        """
+        Доля успешных запросов (со сглаживанием для proxy без статистики)
+        :return: Доля от 0 до 1
+        """
+        return (self.successes + 1) / (self.successes + self.failures + 2)
+
+    def to_dict(self, now: float) -> dict:
+        return {
+            'successes': self.successes,
+            'failures': self.failures,
+            'success_rate': self.success_rate,
+            'latency': self.latency,
+            'cooldown': max(0.0, self.cooldown_until - now)
+        }
+
+
+class ProxyManager:
+    """
+    Выбирает proxy для запроса.
+    Вероятность выбора proxy пропорциональна доле успешных запросов и обратно пропорциональна времени ответа.
+    После ошибки proxy не используется некоторое время, которое удваивается при каждой следующей ошибке подряд.
+    """
+    def __init__(self, proxies: list, cooldown: float = DEFAULT_PROXY_COOLDOWN,
+                 max_cooldown: float = MAX_PROXY_COOLDOWN):
+        """
+        :param proxies: Список proxy в формате 'login:passsword@host:port'
+        :param cooldown: Время, на которое proxy исключается после первой ошибки, в секундах
+        :param max_cooldown: Максимальное время исключения proxy, в секундах
+        """
+        self.__stats = {proxy: ProxyStats() for proxy in proxies}
+        self.__cooldown = cooldown
+        self.__max_cooldown = max_cooldown
+        self.__random = random.Random()
+        self.__lock = threading.Lock()
+
+    @property
+    def proxies(self) -> list:
+        """
+        Возвращает список proxy
+        :return: Proxy
+        """
+        return list(self.__stats)
+
+    def choose(self) -> str:
+        """
+        Выбирает proxy для запроса. Если все proxy исключены после ошибок, возвращает тот,
+        который освободится раньше.
+        :return: Proxy или None, если список пуст
+        """
+        if not self.__stats:
+            return None
+
+        now = time.monotonic()
+        with self.__lock:
+            available = [(proxy, stats) for proxy, stats in self.__stats.items() if stats.cooldown_until <= now]
+            if not available:
+                return min(self.__stats.items(), key=lambda item: item[1].cooldown_until)[0]
+
+            weights = [stats.success_rate / max(stats.latency or DEFAULT_PROXY_LATENCY, 0.001)
+                       for _, stats in available]
+            return self.__random.choices(available, weights)[0][0]
+
+    def report_success(self, proxy: str, latency: float):
+        """
+        Учитывает успешный запрос
+        :param proxy: Proxy
+        :param latency: Время ответа в секундах
+        """
+        stats = self.__stats.get(proxy)
+        if stats is None:
+            return
+
+        with self.__lock:
+            stats.successes += 1
+            stats.consecutive_failures = 0
+            stats.cooldown_until = 0.0
+            stats.latency = latency if stats.latency is None else \
+                stats.latency + PROXY_LATENCY_SMOOTHING * (latency - stats.latency)
+
+    def report_failure(self, proxy: str):
+        """
+        Учитывает неудачный запрос и исключает proxy на время
+        :param proxy: Proxy
+        """
+        stats = self.__stats.get(proxy)
+        if stats is None:
+            return
+
+        with self.__lock:
+            stats.failures += 1
+            stats.consecutive_failures += 1
+            cooldown = min(self.__cooldown * 2 ** (stats.consecutive_failures - 1), self.__max_cooldown)
+            stats.cooldown_until = time.monotonic() + cooldown
+
+    def stats(self) -> dict:
+        """
+        Возвращает статистику по proxy
+        :return: Proxy -> {successes, failures, success_rate, latency, cooldown}
+        """
+        now = time.monotonic()
+        with self.__lock:
+            return {proxy: stats.to_dict(now) for proxy, stats in self.__stats.items()}
@@ -0,0 +1,160 @@
+"""
+Ограничение частоты запросов
+"""
+
+__author__ = 'Игнатьев И.В.'
+
+import asyncio
+import threading
+import time
+
+from .constants import DEFAULT_HOST_RATES
+from .url_index import get_host
+
+
+class TokenBucket:
+    """
+    Ограничитель частоты по алгоритму "ведро с токенами".
+    Токены пополняются со скоростью rate в секунду, но их не может быть больше capacity.
+    Каждый запрос забирает один токен; если токенов нет, запрос ждет пополнения.
+    Можно использовать одновременно из нескольких потоков и асинхронных задач.
+    """
+    def __init__(self, rate: float, capacity: float = None):
+        """
+        :param rate: Количество запросов в секунду
+        :param capacity: Максимальное количество запросов, которое можно выполнить подряд без ожидания.
+                         По умолчанию - max(1, rate).
+        """
+        if not rate or rate <= 0:
+            raise ValueError('Частота запросов должна быть положительным числом.')
+
+        self.rate = rate
+        self.capacity = max(1.0, rate) if capacity is None else capacity
+        self.__tokens = self.capacity
+        self.__updated_at = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def reserve(self, max_wait: float = None):
+        """
+        Забирает токен (возможно, в долг) и возвращает время, которое нужно подождать перед запросом
+        :param max_wait: Максимальное время ожидания. Если ждать нужно дольше, токен не забирается.
+        :return: Время ожидания в секундах или None, если ждать нужно дольше max_wait
+        """
+        with self.__lock:
+            now = time.monotonic()
+            self.__tokens = min(self.capacity, self.__tokens + (now - self.__updated_at) * self.rate)
+            self.__updated_at = now
+
+            delay = 0.0 if self.__tokens >= 1 else (1 - self.__tokens) / self.rate
+            if max_wait is not None and delay > max_wait:
+                return None
+            self.__tokens -= 1
+            return delay
+
+    def acquire(self, max_wait: float = None) -> bool:
+        """
+        Ждет возможности выполнить запрос (блокирует поток)
+        :param max_wait: Максимальное время ожидания
+        :return: False, если ждать нужно дольше max_wait (запрос выполнять нельзя)
+        """
+        delay = self.reserve(max_wait)
+        if delay is None:
+            return False
+        if delay:
+            time.sleep(delay)
+        return True
+
+    async def acquire_async(self, max_wait: float = None) -> bool:
+        """
+        Ждет возможности выполнить запрос (не блокируя цикл событий)
+        :param max_wait: Максимальное время ожидания
+        :return: False, если ждать нужно дольше max_wait (запрос выполнять нельзя)
+        """
+        delay = self.reserve(max_wait)
+        if delay is None:
+            return False
+        if delay:
+            await asyncio.sleep(delay)
+        return True
+
+
+class HostRateLimiter:
+    """
+    Ограничивает частоту запросов к хостам: для каждого хоста используется свое ведро с токенами.
+    Частота задается для домена и действует также на его поддомены (www.yandex.ru ограничивается как yandex.ru).
+    Можно использовать одновременно из нескольких потоков и асинхронных задач.
+    """
+    def __init__(self, rates: dict = None, default_rate: float = None):
+        """
+        :param rates: Домен -> количество запросов в секунду. По умолчанию DEFAULT_HOST_RATES.
+        :param default_rate: Количество запросов в секунду к остальным хостам. None - без ограничения.
+        """
+        self.rates = {host.lower(): rate for host, rate in (DEFAULT_HOST_RATES if rates is None else rates).items()}
+        self.default_rate = default_rate
+        self.__buckets = {}
+        self.__lock = threading.Lock()
+
+    def get_rate(self, host: str):
+        """
+        Возвращает ограничение частоты запросов к хосту
+        :param host: Хост
+        :return: Количество запросов в секунду или None, если частота не ограничена
+        """
+        domain = self.__find_domain(host)
+        return self.default_rate if domain is None else self.rates[domain]
+
+    def get_bucket(self, url: str):
+        """
+        Возвращает ведро с токенами для хоста ссылки. Поддомены домена из rates используют общее ведро.
+        :param url: Ссылка
+        :return: TokenBucket или None, если частота не ограничена
+        """
+        host = get_host(url)
+        domain = self.__find_domain(host)
+        rate = self.default_rate if domain is None else self.rates[domain]
+        if not rate:
+            return None
+
+        key = domain or host
+        with self.__lock:
+            bucket = self.__buckets.get(key)
+            if bucket is None:
+                bucket = self.__buckets[key] = TokenBucket(rate)
+            return bucket
+
+    def __find_domain(self, host: str):
+        """
+        Ищет в rates хост или домен, поддоменом которого он является
+        :param host: Хост
+        :return: Домен или None
+        """
+        domain = host
+        while domain:
+            if domain in self.rates:
+                return domain
+            domain = domain.partition('.')[2]
+        return None
+
+    def acquire(self, url: str, deadline: float = None) -> bool:
+        """
+        Ждет возможности выполнить запрос к хосту ссылки (блокирует поток)
+        :param url: Ссылка
+        :param deadline: Время (по time.monotonic), после которого запрос не выполняется
+        :return: False, если до deadline запрос выполнить нельзя
+        """
+        bucket = self.get_bucket(url)
+        if bucket is None:
+            return True
+        return bucket.acquire(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+    async def acquire_async(self, url: str, deadline: float = None) -> bool:
+        """
+        Ждет возможности выполнить запрос к хосту ссылки (не блокируя цикл событий)
+        :param url: Ссылка
+        :param deadline: Время (по time.monotonic), после которого запрос не выполняется
+        :return: False, если до deadline запрос выполнить нельзя
+        """
+        bucket = self.get_bucket(url)
+        if bucket is None:
+            return True
+        return await bucket.acquire_async(None if deadline is None else max(0.0, deadline - time.monotonic()))
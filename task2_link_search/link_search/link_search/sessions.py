@@ -0,0 +1,143 @@
+"""
+Пул HTTP-сессий
+"""
+
+__author__ = 'Игнатьев И.В.'
+
+from collections import OrderedDict
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .constants import DEFAULT_MAX_SESSIONS, DEFAULT_POOL_SIZE, DEFAULT_SESSION_IDLE_TIMEOUT
+
+
+class SessionPool:
+    """
+    Хранит по одной HTTP-сессии на каждый proxy.
+    Сессии держат открытыми соединения (keep-alive), поэтому повторные запросы через тот же proxy
+    не устанавливают TCP/TLS соединение заново. Давно не использованные сессии закрываются.
+    Сессия, выданная get, считается используемой до вызова release: вытесненная из пула используемая сессия
+    закрывается только после освобождения всеми, кто ее получил.
+    """
+    def __init__(self, max_sessions: int = DEFAULT_MAX_SESSIONS, pool_size: int = DEFAULT_POOL_SIZE,
+                 idle_timeout: float = DEFAULT_SESSION_IDLE_TIMEOUT):
+        """
+        :param max_sessions: Максимальное количество сессий. При превышении закрывается самая старая.
+        :param pool_size: Максимальное количество соединений с одним хостом в сессии
+        :param idle_timeout: Время простоя в секундах, после которого сессия закрывается
+        """
+        self.__max_sessions = max_sessions
+        self.__pool_size = pool_size
+        self.__idle_timeout = idle_timeout
+
+        # proxy -> [сессия, время последнего использования]
+        self.__sessions = OrderedDict()
+
+        # Сессия -> количество использующих ее запросов
+        self.__in_use = {}
+
+        # Вытесненные из пула сессии, которые будут закрыты после освобождения
+        self.__retired = set()
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.__sessions)
+
+    def get(self, proxy: str = None) -> requests.Session:
+        """
+        Возвращает сессию для proxy, при необходимости создает новую.
+        После завершения запроса (закрытия ответа) сессию нужно освободить (release).
+        :param proxy: Proxy в формате 'login:passsword@host:port' или None
+        :return: Сессия
+        """
+        now = time.monotonic()
+        with self.__lock:
+            self.__evict_idle(now)
+
+            item = self.__sessions.get(proxy)
+            if item is not None:
+                item[1] = now
+                self.__sessions.move_to_end(proxy)
+                session = item[0]
+            else:
+                session = self.__create_session()
+                self.__sessions[proxy] = [session, now]
+                while len(self.__sessions) > self.__max_sessions:
+                    _, (old_session, _) = self.__sessions.popitem(last=False)
+                    self.__close_session(old_session)
+
+            self.__in_use[session] = self.__in_use.get(session, 0) + 1
+            return session
+
+    def release(self, session: requests.Session):
+        """
+        Освобождает сессию, полученную get. Вытесненная из пула сессия закрывается после последнего освобождения.
+        :param session: Сессия
+        """
+        with self.__lock:
+            count = self.__in_use.get(session, 0) - 1
+            if count > 0:
+                self.__in_use[session] = count
+                return
+
+            self.__in_use.pop(session, None)
+            if session in self.__retired:
+                self.__retired.remove(session)
+                session.close()
+
+    def evict_idle(self):
+        """
+        Закрывает сессии, которые не использовались дольше idle_timeout
+        """
+        with self.__lock:
+            self.__evict_idle(time.monotonic())
+
+    def close(self):
+        """
+        Закрывает все сессии, в том числе используемые
+        """
+        with self.__lock:
+            for session, _ in self.__sessions.values():
+                session.close()
+            for session in self.__retired:
+                session.close()
+            self.__sessions.clear()
+            self.__retired.clear()
+            self.__in_use.clear()
+
+    def __evict_idle(self, now: float):
+        """
+        Закрывает простаивающие сессии. Вызывается под блокировкой.
+        :param now: Текущее время
+        """
+        while self.__sessions:
+            proxy, (session, last_used) = next(iter(self.__sessions.items()))
+            if now - last_used <= self.__idle_timeout:
+                break
+            del self.__sessions[proxy]
+            self.__close_session(session)
+
+    def __close_session(self, session: requests.Session):
+        """
+        Закрывает вытесненную из пула сессию или, если она используется, откладывает закрытие до release.
+        Вызывается под блокировкой.
+        :param session: Сессия
+        """
+        if self.__in_use.get(session):
+            self.__retired.add(session)
+        else:
+            session.close()
+
+    def __create_session(self) -> requests.Session:
+        """
+        Создает сессию с ограниченным пулом соединений
+        :return: Сессия
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.__pool_size, pool_maxsize=self.__pool_size)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
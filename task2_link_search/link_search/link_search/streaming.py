@@ -0,0 +1,71 @@
+"""
+Потоковое чтение тела HTTP-ответа
+"""
+
+__author__ = 'Игнатьев И.В.'
+
+import codecs
+import time
+
+import requests
+
+from .constants import DEFAULT_MAX_BYTES, STREAM_CHUNK_SIZE
+
+
+class BodyReader:
+    """
+    Читает тело ответа частями и декодирует его в текст.
+    Чтение прекращается, когда прочитано max_bytes байт или наступил deadline.
+    Ответ должен быть получен с параметром stream=True.
+    """
+    def __init__(self, response, max_bytes: int = DEFAULT_MAX_BYTES, chunk_size: int = STREAM_CHUNK_SIZE,
+                 deadline: float = None):
+        """
+        :param response: Ответ requests
+        :param max_bytes: Максимальное количество байт, которое можно прочитать
+        :param chunk_size: Размер читаемой части в байтах
+        :param deadline: Время (по time.monotonic), после которого чтение прекращается
+        """
+        self.__response = response
+        self.__max_bytes = max_bytes
+        self.__chunk_size = chunk_size
+        self.__deadline = deadline
+
+        # Прочитано байт
+        self.received = 0
+
+        # Тело прочитано полностью
+        self.complete = False
+
+        # Чтение прервано из-за превышения max_bytes или наступления deadline
+        self.truncated = False
+
+    def __iter__(self):
+        """
+        Генератор частей текста
+        """
+        try:
+            decoder = codecs.getincrementaldecoder(self.__response.encoding or 'utf-8')(errors='replace')
+        except LookupError:
+            decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+        try:
+            for data in self.__response.iter_content(self.__chunk_size):
+                data = data[:self.__max_bytes - self.received]
+                self.received += len(data)
+
+                text = decoder.decode(data)
+                if text:
+                    yield text
+
+                if self.received >= self.__max_bytes or \
+                        self.__deadline is not None and time.monotonic() >= self.__deadline:
+                    self.truncated = True
+                    return
+        except requests.RequestException:
+            return
+
+        text = decoder.decode(b'', final=True)
+        if text:
+            yield text
+        self.complete = True
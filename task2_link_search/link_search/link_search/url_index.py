@@ -0,0 +1,134 @@
+"""
+Индекс просмотренных ссылок для исключения дублей
+"""
+
+__author__ = 'Игнатьев И.В.'
+
+import hashlib
+import math
+import re
+from urllib.parse import urlsplit, urlunsplit
+
+from .constants import DEFAULT_BLOOM_ERROR_RATE
+
+# Порты по умолчанию для схем
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Приводит ссылку к виду, по которому можно сравнивать ссылки между собой:
+    схема и хост в нижнем регистре, без порта по умолчанию, без фрагмента, без повторяющихся и завершающего '/'.
+    :param url: Ссылка
+    :return: Нормализованная ссылка
+    """
+    try:
+        parsed_url = urlsplit(url.strip())
+        port = parsed_url.port
+    except ValueError:
+        return url
+
+    scheme = parsed_url.scheme.lower()
+    netloc = (parsed_url.hostname or '').rstrip('.')
+    if parsed_url.username is not None or parsed_url.password is not None:
+        userinfo = parsed_url.username or ''
+        if parsed_url.password is not None:
+            userinfo += f':{parsed_url.password}'
+        netloc = f'{userinfo}@{netloc}'
+    if port is not None and port != DEFAULT_PORTS.get(scheme):
+        netloc += f':{port}'
+
+    path = re.sub('/{2,}', '/', parsed_url.path).rstrip('/')
+    return urlunsplit((scheme, netloc, path, parsed_url.query, ''))
+
+
+def get_host(url: str) -> str:
+    """
+    Возвращает хост ссылки
+    :param url: Ссылка
+    :return: Хост в нижнем регистре
+    """
+    try:
+        return (urlsplit(url).hostname or '').lower()
+    except ValueError:
+        return ''
+
+
+class BloomFilter:
+    """
+    Фильтр Блума. Занимает фиксированный объем памяти, но с вероятностью error_rate
+    может ошибочно сообщить, что элемент уже был добавлен.
+    """
+    def __init__(self, capacity: int, error_rate: float = DEFAULT_BLOOM_ERROR_RATE):
+        """
+        :param capacity: Ожидаемое количество элементов
+        :param error_rate: Допустимая вероятность ложного срабатывания
+        """
+        self.__bit_count = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.__hash_count = max(1, round(self.__bit_count / capacity * math.log(2)))
+        self.__bits = bytearray((self.__bit_count + 7) // 8)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.__bits[bit >> 3] & (1 << (bit & 7)) for bit in self.__bit_positions(item))
+
+    def add(self, item: str) -> bool:
+        """
+        Добавляет элемент
+        :param item: Элемент
+        :return: Элемент добавлен впервые
+        """
+        added = False
+        for bit in self.__bit_positions(item):
+            mask = 1 << (bit & 7)
+            if not self.__bits[bit >> 3] & mask:
+                self.__bits[bit >> 3] |= mask
+                added = True
+        return added
+
+    def __bit_positions(self, item: str):
+        """
+        Номера битов элемента (двойное хэширование)
+        :param item: Элемент
+        """
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        hash1 = int.from_bytes(digest[:8], 'little')
+        hash2 = int.from_bytes(digest[8:], 'little') | 1
+        for idx in range(self.__hash_count):
+            yield (hash1 + idx * hash2) % self.__bit_count
+
+
+class UrlIndex:
+    """
+    Множество ссылок, сравниваемых по нормализованному виду.
+    По умолчанию хранит ссылки точно. Если задан capacity, использует фильтр Блума фиксированного размера.
+    """
+    def __init__(self, capacity: int = None, error_rate: float = DEFAULT_BLOOM_ERROR_RATE):
+        """
+        :param capacity: Ожидаемое количество ссылок для фильтра Блума. Если не задано - ссылки хранятся в множестве.
+        :param error_rate: Допустимая вероятность ложного срабатывания фильтра Блума
+        """
+        self.__items = set() if capacity is None else BloomFilter(capacity, error_rate)
+        self.__count = 0
+
+    def __len__(self):
+        return self.__count
+
+    def __contains__(self, url: str) -> bool:
+        return normalize_url(url) in self.__items
+
+    def add(self, url: str) -> bool:
+        """
+        Добавляет ссылку
+        :param url: Ссылка
+        :return: Ссылки еще не было в индексе
+        """
+        key = normalize_url(url)
+        if isinstance(self.__items, set):
+            if key in self.__items:
+                return False
+            self.__items.add(key)
+        elif not self.__items.add(key):
+            return False
+
+        self.__count += 1
+        return True
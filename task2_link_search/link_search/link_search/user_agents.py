@@ -0,0 +1,94 @@
+"""
+Набор заголовков User-Agent для запросов
+"""
+
+__author__ = 'Игнатьев И.В.'
+
+import os
+import random
+import threading
+import time
+
+from .constants import USER_AGENTS_FILE, DEFAULT_USER_AGENT_CACHE, DEFAULT_USER_AGENT_CACHE_TTL
+
+# Путь к файлу -> загруженные из него User-Agent (общие для всех наборов процесса)
+_loaded = {}
+_lock = threading.Lock()
+
+
+class UserAgentPool:
+    """
+    Возвращает случайный User-Agent из набора.
+    Набор загружается при первом обращении: из дискового кэша (если он есть и не устарел),
+    иначе из файла, поставляемого с пакетом. Загруженный набор хранится в памяти и используется всеми
+    экземплярами в процессе. Дисковый кэш обновляется методом update и используется всеми процессами.
+    """
+    def __init__(self, cache_path: str = DEFAULT_USER_AGENT_CACHE, cache_ttl: float = DEFAULT_USER_AGENT_CACHE_TTL):
+        """
+        :param cache_path: Путь к дисковому кэшу. None - кэш не используется.
+        :param cache_ttl: Время, в течение которого кэш считается актуальным, в секундах
+        """
+        self.cache_path = cache_path
+        self.cache_ttl = cache_ttl
+        self.__agents = None
+
+    @property
+    def random(self) -> str:
+        """
+        Возвращает случайный User-Agent
+        :return: User-Agent
+        """
+        if self.__agents is None:
+            self.__agents = self.__load()
+        return random.choice(self.__agents)
+
+    def update(self, count: int = 100) -> int:
+        """
+        Обновляет дисковый кэш из fake_useragent (требуется установленный пакет fake-useragent и, возможно, сеть)
+        :param count: Количество User-Agent, запрашиваемых у fake_useragent
+        :return: Количество различных User-Agent в кэше
+        """
+        from fake_useragent import UserAgent
+
+        user_agent = UserAgent()
+        agents = sorted({user_agent.random for _ in range(count)})
+        if self.cache_path is None or not agents:
+            return 0
+
+        # Файл заменяется целиком, чтобы другие процессы не прочитали его частично
+        os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+        tmp_path = f'{self.cache_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            file.write('\n'.join(agents) + '\n')
+        os.replace(tmp_path, self.cache_path)
+
+        with _lock:
+            _loaded[self.cache_path] = tuple(agents)
+        self.__agents = None
+        return len(agents)
+
+    def __load(self) -> tuple:
+        """
+        Загружает набор User-Agent. Пустой дисковый кэш не используется.
+        :return: User-Agent
+        """
+        if self.cache_path is not None and os.path.exists(self.cache_path) and \
+                time.time() - os.path.getmtime(self.cache_path) < self.cache_ttl:
+            agents = self.__load_file(self.cache_path)
+            if agents:
+                return agents
+        return self.__load_file(USER_AGENTS_FILE)
+
+    @staticmethod
+    def __load_file(path: str) -> tuple:
+        """
+        Загружает User-Agent из файла (один раз для процесса)
+        :param path: Путь к файлу
+        :return: User-Agent
+        """
+        with _lock:
+            agents = _loaded.get(path)
+            if agents is None:
+                with open(path, encoding='utf-8') as file:
+                    agents = _loaded[path] = tuple(line.strip() for line in file if line.strip())
+            return agents
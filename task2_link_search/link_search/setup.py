@@ -6,6 +6,7 @@ setup(
     name=PACKAGE,
     version= __import__(PACKAGE).__version__,
     packages=[PACKAGE],
+    package_data={PACKAGE: ['data/*.txt']},
     url='',
     license='',
     author='Ilya Ignatyev',
@@ -13,8 +14,12 @@ setup(
     description='Searches urls on sites',
     install_requires=[
         'lxml==4.4.2',
+        'requests==2.22.0',
         'beautifulsoup4==4.8.1',
-        'fake-useragent==0.1.11',
         'validators==0.14.1'
-    ]
+    ],
+    extras_require={
+        # Обновление набора User-Agent (UserAgentPool.update)
+        'user-agents': ['fake-useragent==0.1.11']
+    }
 )
@@ -2,10 +2,29 @@
 Тесты
 """
 
+import asyncio
+import threading
+import time
+
 import pytest
+import requests
 import validators
 
+from benchmarks.local_server import LocalSearchServer
 from link_search.link_search import LinkSearch
+from link_search.link_search.async_fetch import AsyncLinkFetcher
+from link_search.link_search.cache import CacheEntry, FileResponseCache
+from link_search.link_search.constants import YANDEX_SEARCH_PARAMS, DEFAULT_CRAWL_SEED_COUNT
+from link_search.link_search.checkpoint import CrawlCheckpoint
+from link_search.link_search.crawler import Frontier
+from link_search.link_search.link_parser import LinkExtractor
+from link_search.link_search.metrics import Metrics
+from link_search.link_search.policy import CircuitBreaker, FetchPolicy
+from link_search.link_search.proxies import ProxyManager
+from link_search.link_search.rate_limit import HostRateLimiter, TokenBucket
+from link_search.link_search.sessions import SessionPool
+from link_search.link_search.url_index import normalize_url, UrlIndex
+from link_search.link_search.user_agents import UserAgentPool
 
 
 @pytest.fixture(scope='module')
@@ -99,3 +118,724 @@ def test_get_site_links(link_search):
     site_links = link_search.get_site_links('http://wikipedia.org', link_limit=5)
     assert 'http://en.wikipedia.org/' in site_links
     assert len([1 for link in site_links if validators.url(link)]) == 5
+
+
+def test_async_fetcher():
+    """
+    Тест параллельного получения ссылок
+    """
+    active = 0
+    max_active = 0
+    lock = threading.Lock()
+
+    def get_links(url):
+        nonlocal active, max_active
+        with lock:
+            active += 1
+            max_active = max(max_active, active)
+        time.sleep(0.05)
+        with lock:
+            active -= 1
+        return [f'{url}/{idx}' for idx in range(2)]
+
+    urls = [f'http://site{idx}.ru' for idx in range(8)]
+    fetcher = AsyncLinkFetcher(get_links, concurrency=3)
+
+    result = fetcher.collect(urls)
+    assert set(url for url, _ in result) == set(urls)
+    assert all(links == [f'{url}/0', f'{url}/1'] for url, links in result)
+    assert max_active == 3
+
+    # Досрочная остановка
+    result = fetcher.collect(urls, stop=lambda url, links: True)
+    assert len(result) == 1
+
+    # Синхронный вызов из асинхронного кода
+    async def collect():
+        return fetcher.collect(urls)
+
+    assert set(url for url, _ in asyncio.run(collect())) == set(urls)
+
+    with pytest.raises(ValueError):
+        AsyncLinkFetcher(get_links, concurrency=0)
+
+
+def test_session_pool():
+    """
+    Тест пула HTTP-сессий
+    """
+    pool = SessionPool(max_sessions=2, idle_timeout=60)
+
+    # Для одного proxy используется одна сессия
+    session = pool.get('proxy1')
+    assert pool.get('proxy1') is session
+    assert pool.get(None) is not session
+    assert len(pool) == 2
+
+    # При превышении количества сессий закрывается самая старая
+    pool.get('proxy2')
+    assert len(pool) == 2
+    assert pool.get('proxy1') is not session
+
+    pool.close()
+    assert len(pool) == 0
+
+    # Используемая сессия при вытеснении закрывается только после освобождения
+    pool = SessionPool(max_sessions=1, idle_timeout=60)
+    closed = []
+    session = pool.get('proxy1')
+    session.close = lambda: closed.append(session)
+    pool.release(pool.get('proxy1'))
+    session2 = pool.get('proxy2')
+    assert closed == []
+    pool.release(session)
+    assert closed == [session]
+
+    # Свободная сессия закрывается сразу
+    pool.release(session2)
+    session2.close = lambda: closed.append(session2)
+    pool.get('proxy1')
+    assert closed[-1] is session2
+    pool.close()
+
+    # Пустой пул, переданный в LinkSearch, используется (и может разделяться несколькими экземплярами)
+    pool = SessionPool(max_sessions=2)
+    assert LinkSearch(sessions=pool).sessions is pool
+
+    # Простаивающие сессии закрываются
+    pool = SessionPool(idle_timeout=0.01)
+    session = pool.get('proxy1')
+    time.sleep(0.02)
+    pool.evict_idle()
+    assert len(pool) == 0
+    assert pool.get('proxy1') is not session
+
+
+class FakeResponse:
+    """
+    Ответ сайта для тестов без обращения к сети
+    """
+    def __init__(self, text='', status_code=200, headers=None, chunk_size=None):
+        self.text = text
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.headers = headers or {}
+        self.encoding = 'utf-8'
+        self.chunk_size = chunk_size
+        self.received = 0
+        self.closed = False
+
+    def iter_content(self, chunk_size=1):
+        content = self.text.encode(self.encoding)
+        chunk_size = self.chunk_size or chunk_size
+        for start in range(0, len(content), chunk_size):
+            self.received += len(content[start:start + chunk_size])
+            yield content[start:start + chunk_size]
+
+    def close(self):
+        self.closed = True
+
+
+class FakeSession:
+    """
+    Сессия, возвращающая заранее заданные ответы и запоминающая запросы.
+    Ответы задаются списком (по очереди) или словарем url -> ответ. Исключение вместо ответа выбрасывается.
+    """
+    def __init__(self, responses):
+        self.responses = responses if isinstance(responses, dict) else list(responses)
+        self.requests = []
+        self.urls = []
+
+    def get(self, url, headers=None, proxies=None, **kwargs):
+        self.requests.append(headers)
+        self.urls.append(url)
+        if isinstance(self.responses, dict):
+            response = self.responses.get(url) or FakeResponse(status_code=404)
+        else:
+            response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+class FakeSessionPool:
+    def __init__(self, session):
+        self.session = session
+
+    def get(self, proxy=None):
+        return self.session
+
+    def release(self, session):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_file_cache(tmp_path):
+    """
+    Тест кэша ответов на диске
+    """
+    cache = FileResponseCache(str(tmp_path), ttl=60, max_size=1000)
+    assert cache.get('http://site.ru') is None
+
+    cache.set('http://site.ru', CacheEntry('<a href="/1">1</a>', etag='"v1"'))
+    entry = FileResponseCache(str(tmp_path)).get('http://site.ru')
+    assert entry.body == '<a href="/1">1</a>'
+    assert entry.is_fresh(60)
+    assert entry.validators() == {'If-None-Match': '"v1"'}
+
+    # Вытеснение по размеру
+    cache.set('http://site2.ru', CacheEntry('x' * 800))
+    assert cache.get('http://site.ru') is None
+    assert cache.get('http://site2.ru') is not None
+
+
+def test_cached_site_links(tmp_path):
+    """
+    Тест получения ссылок с использованием кэша и условных запросов
+    """
+    html = '<a href="/1">1</a><a href="/2">2</a>'
+    session = FakeSession([FakeResponse(html, headers={'ETag': '"v1"'}), FakeResponse(status_code=304)])
+    cache = FileResponseCache(str(tmp_path), ttl=60)
+    link_search = LinkSearch(sessions=FakeSessionPool(session), cache=cache)
+
+    links = link_search.get_site_links('http://site.ru')
+    assert links == ['http://site.ru//1', 'http://site.ru//2']
+
+    # Актуальный ответ берется из кэша без запроса
+    assert link_search.get_site_links('http://site.ru') == links
+    assert len(session.requests) == 1
+
+    # Устаревший ответ проверяется условным запросом
+    cache.ttl = 0
+    assert link_search.get_site_links('http://site.ru') == links
+    assert session.requests[1]['If-None-Match'] == '"v1"'
+
+
+def test_iter_search_links():
+    """
+    Тест генераторов ссылок: запросы выполняются только по мере получения ссылок
+    """
+    search_url = YANDEX_SEARCH_PARAMS['url']
+    link_class = YANDEX_SEARCH_PARAMS['link_class']
+    session = FakeSession({
+        search_url.format('wiki', 0): FakeResponse(
+            f'<a class="{link_class}" href="http://site1.ru">1</a><a class="{link_class}" href="http://site2.ru">2</a>'
+            '<a href="http://ads.ru">ads</a>'),
+        'http://site1.ru': FakeResponse('<a href="http://site1.ru/a">a</a><a href="http://site1.ru/b">b</a>'),
+        'http://site2.ru': FakeResponse('<a href="http://site2.ru/a">a</a>'),
+    })
+    link_search = LinkSearch(sessions=FakeSessionPool(session))
+
+    links = link_search.iter_search_links('wiki', 10, deep=True)
+    assert next(links) == 'http://site1.ru'
+    assert session.urls == [search_url.format('wiki', 0)]
+    assert next(links) == 'http://site1.ru/a'
+    assert len(session.urls) == 2
+    links.close()
+    assert len(session.urls) == 2
+
+    assert list(link_search.iter_search_links('wiki', 3, deep=True)) == \
+        ['http://site1.ru', 'http://site1.ru/a', 'http://site1.ru/b']
+
+    session.urls.clear()
+    assert link_search.get_search_links('wiki', 10) == ['http://site1.ru', 'http://site2.ru']
+    assert session.urls == [search_url.format('wiki', 0), search_url.format('wiki', 1)]
+
+    assert list(link_search.iter_site_links('http://site1.ru', link_limit=1)) == ['http://site1.ru/a']
+    assert list(link_search.iter_site_links('http://site1.ru', link_limit=0)) == []
+
+
+def test_link_extractor():
+    """
+    Тест потокового извлечения ссылок
+    """
+    html = '<p><a class="x y" href="/1">1</a><a href="#">#</a><a name="n">n</a>' \
+           '<a class="y" href="/2?a=1&amp;b=2">2</a><a class="y" href="/3">3</a></p>'
+
+    # Разбор по частям дает тот же результат, что и разбор целиком
+    extractor = LinkExtractor()
+    links = []
+    for start in range(0, len(html), 7):
+        links += extractor.feed_links(html[start:start + 7])
+    links += extractor.close_links()
+    assert links == ['/1', '#', '/2?a=1&b=2', '/3']
+
+    # Фильтр по классу, подготовка ссылок и лимит
+    extractor = LinkExtractor('y', 2, lambda href: href if href != '/1' else None)
+    assert extractor.feed_links(html) == ['/2?a=1&b=2', '/3']
+    assert extractor.done
+    assert extractor.feed_links('<a class="y" href="/4">4</a>') == []
+
+
+def test_streaming_site_links(tmp_path):
+    """
+    Тест потоковой загрузки: после нахождения нужных ссылок и при превышении лимита байт загрузка прекращается
+    """
+    html = '<a href="http://site.ru/1">1</a><a href="http://site.ru/2">2</a>' + '<p>текст</p>' * 1000
+    response = FakeResponse(html, chunk_size=64)
+    link_search = LinkSearch(sessions=FakeSessionPool(FakeSession([response])))
+    assert link_search.get_site_links('http://site.ru', link_limit=1) == ['http://site.ru/1']
+    assert response.received == 64
+    assert response.closed
+
+    response = FakeResponse(html, chunk_size=64)
+    link_search = LinkSearch(sessions=FakeSessionPool(FakeSession([response])), max_bytes=40)
+    assert link_search.get_site_links('http://site.ru') == ['http://site.ru/1']
+    assert response.received == 64
+
+    # При использовании кэша страница дочитывается, чтобы сохранить ее целиком
+    response = FakeResponse(html, chunk_size=64)
+    cache = FileResponseCache(str(tmp_path))
+    link_search = LinkSearch(sessions=FakeSessionPool(FakeSession([response])), cache=cache)
+    assert link_search.get_site_links('http://site.ru', link_limit=1) == ['http://site.ru/1']
+    assert cache.get('http://site.ru').body == html
+
+
+def test_url_index():
+    """
+    Тест нормализации ссылок и индекса ссылок
+    """
+    assert normalize_url('HTTP://Site.RU:80/a/#top') == 'http://site.ru/a'
+    assert normalize_url('https://site.ru:443') == 'https://site.ru'
+    assert normalize_url('http://site.ru:8080//a//b/?q=1#x') == 'http://site.ru:8080/a/b?q=1'
+    assert normalize_url('http://site.ru//1') == normalize_url('http://site.ru/1/')
+
+    for index in (UrlIndex(), UrlIndex(capacity=1000)):
+        assert index.add('http://site.ru/a')
+        assert not index.add('HTTP://SITE.RU/a/#b')
+        assert 'http://site.ru:80/a' in index
+        assert 'http://site.ru/b' not in index
+        assert len(index) == 1
+
+    # Ложные срабатывания фильтра Блума в пределах заданной вероятности
+    index = UrlIndex(capacity=10000, error_rate=0.01)
+    added = sum(index.add(f'http://site.ru/{idx}') for idx in range(10000))
+    assert added > 9800
+
+
+def test_deep_search_unique_links():
+    """
+    Тест глубокого поиска без дублей
+    """
+    search_url = YANDEX_SEARCH_PARAMS['url']
+    link_class = YANDEX_SEARCH_PARAMS['link_class']
+    search_html = f'<a class="{link_class}" href="http://site1.ru">1</a>' \
+                  f'<a class="{link_class}" href="http://SITE1.ru/#top">1</a>' \
+                  f'<a class="{link_class}" href="http://site2.ru">2</a>'
+    session = FakeSession({
+        search_url.format('wiki', 0): FakeResponse(search_html),
+        search_url.format('wiki', 1): FakeResponse(search_html),
+        'http://site1.ru': FakeResponse('<a href="http://site2.ru/">2</a><a href="http://site1.ru/a">a</a>'),
+        'http://site2.ru': FakeResponse('<a href="http://site1.ru/a#b">a</a>'),
+    })
+    link_search = LinkSearch(sessions=FakeSessionPool(session))
+
+    links = link_search.get_search_links('wiki', 10, deep=True)
+    assert len(links) == 3
+    assert set(map(normalize_url, links)) == {'http://site1.ru', 'http://site1.ru/a', 'http://site2.ru'}
+    assert session.urls.count('http://site1.ru') == 1
+
+    links = list(link_search.iter_search_links('wiki', 10, deep=True))
+    assert links == ['http://site1.ru', 'http://site2.ru/', 'http://site1.ru/a']
+
+
+def test_frontier():
+    """
+    Тест очереди обхода: приоритеты, ограничение одновременных запросов и задержка для хоста
+    """
+    frontier = Frontier(host_delay=1, host_concurrency=1)
+    frontier.push('http://a.ru/2', 2)
+    frontier.push('http://a.ru/1', 1)
+    frontier.push('http://b.ru/3', 3)
+    assert len(frontier) == 3
+
+    assert frontier.pop(0) == ('http://a.ru/1', 1)
+    # Хост a.ru занят, выдается ссылка другого хоста
+    assert frontier.pop(0) == ('http://b.ru/3', 3)
+    assert frontier.pop(0) is None
+    assert frontier.wait_time(0) is None
+
+    # После завершения запроса нужно выждать задержку
+    frontier.release('http://a.ru/1')
+    assert frontier.wait_time(0.5) == 0.5
+    assert frontier.pop(0.5) is None
+    assert frontier.pop(1) == ('http://a.ru/2', 2)
+    assert len(frontier) == 0
+
+
+def test_crawl():
+    """
+    Тест многоуровневого обхода
+    """
+    search_url = YANDEX_SEARCH_PARAMS['url']
+    link_class = YANDEX_SEARCH_PARAMS['link_class']
+    session = FakeSession({
+        search_url.format('wiki', 0): FakeResponse(f'<a class="{link_class}" href="http://a.ru">a</a>'
+                                                   f'<a class="{link_class}" href="http://b.ru">b</a>'),
+        'http://a.ru': FakeResponse('<a href="http://a.ru/1">1</a><a href="http://b.ru">b</a>'),
+        'http://b.ru': FakeResponse('<a href="http://b.ru/1">1</a>'),
+        'http://a.ru/1': FakeResponse('<a href="http://a.ru/2">2</a>'),
+        'http://b.ru/1': FakeResponse('<a href="http://b.ru/2">2</a>'),
+        'http://a.ru/2': FakeResponse('<a href="http://a.ru/3">3</a>'),
+    })
+    link_search = LinkSearch(sessions=FakeSessionPool(session))
+
+    links = link_search.crawl('wiki', 100, depth=1, host_delay=0)
+    assert set(links) == {'http://a.ru', 'http://b.ru', 'http://a.ru/1', 'http://b.ru/1'}
+
+    links = link_search.crawl('wiki', 100, depth=2, host_delay=0)
+    assert set(links) == {'http://a.ru', 'http://b.ru', 'http://a.ru/1', 'http://b.ru/1', 'http://a.ru/2',
+                          'http://b.ru/2'}
+    assert session.urls.count('http://b.ru') == 2
+
+    assert len(link_search.crawl('wiki', 3, depth=3, host_delay=0)) == 3
+
+
+def test_crawl_checkpoint(tmp_path):
+    """
+    Тест продолжения прерванного обхода
+    """
+    search_url = YANDEX_SEARCH_PARAMS['url']
+    link_class = YANDEX_SEARCH_PARAMS['link_class']
+    responses = {
+        search_url.format('wiki', 0): FakeResponse(f'<a class="{link_class}" href="http://a.ru">a</a>'
+                                                   f'<a class="{link_class}" href="http://b.ru">b</a>'),
+        'http://a.ru': FakeResponse('<a href="http://a.ru/1">1</a>'),
+        'http://b.ru': FakeResponse('<a href="http://b.ru/1">1</a>'),
+        'http://a.ru/1': RuntimeError('Обход прерван'),
+        'http://b.ru/1': FakeResponse('<a href="http://b.ru/2">2</a>'),
+    }
+    link_search = LinkSearch(concurrency=1, sessions=FakeSessionPool(FakeSession(responses)))
+    with CrawlCheckpoint(str(tmp_path / 'crawl.db')) as checkpoint:
+        with pytest.raises(RuntimeError):
+            link_search.crawl('wiki', 100, depth=2, host_delay=0, checkpoint=checkpoint)
+
+    # Поиск и загруженные страницы повторно не запрашиваются
+    responses['http://a.ru/1'] = FakeResponse('<a href="http://a.ru/2">2</a>')
+    session = FakeSession(responses)
+    link_search = LinkSearch(concurrency=1, sessions=FakeSessionPool(session))
+    with CrawlCheckpoint(str(tmp_path / 'crawl.db')) as checkpoint:
+        assert checkpoint.started
+        links = link_search.crawl('wiki', 100, depth=2, host_delay=0, checkpoint=checkpoint)
+    assert links[:4] == ['http://a.ru', 'http://b.ru', 'http://a.ru/1', 'http://b.ru/1']
+    assert set(links[4:]) == {'http://a.ru/2', 'http://b.ru/2'}
+    assert sorted(session.urls) == ['http://a.ru/1', 'http://b.ru/1']
+
+    # Обход с сохранением состояния из асинхронного кода (выполняется во вспомогательном потоке)
+    async def crawl():
+        with CrawlCheckpoint(str(tmp_path / 'async_crawl.db')) as async_checkpoint:
+            return link_search.crawl('wiki', 100, depth=2, host_delay=0, checkpoint=async_checkpoint)
+
+    assert set(asyncio.run(crawl())) == set(links)
+
+    # Состояние другого обхода не продолжается
+    with CrawlCheckpoint(str(tmp_path / 'crawl.db')) as checkpoint:
+        with pytest.raises(ValueError):
+            link_search.crawl('python', 100, depth=2, host_delay=0, checkpoint=checkpoint)
+        with pytest.raises(ValueError):
+            link_search.crawl('wiki', 100, depth=3, host_delay=0, checkpoint=checkpoint)
+
+
+def test_parse_pool():
+    """
+    Тест разбора страниц в пуле процессов
+    """
+    html = '<a href="/1">1</a><a href="#">#</a><a href="http://b.ru/2">2</a><a href="/3">3</a>'
+    session = FakeSession([FakeResponse(html), FakeResponse(html)])
+    link_search = LinkSearch(sessions=FakeSessionPool(session), parse_processes=2)
+    try:
+        assert link_search.get_site_links('http://a.ru') == ['http://a.ru//1', 'http://b.ru/2', 'http://a.ru//3']
+        assert link_search.get_site_links('http://a.ru', link_limit=2) == ['http://a.ru//1', 'http://b.ru/2']
+    finally:
+        link_search.close()
+
+
+def test_proxy_manager():
+    """
+    Тест выбора proxy с учетом ошибок и времени ответа
+    """
+    manager = ProxyManager(['fast', 'slow', 'dead'], cooldown=60)
+    manager.report_success('fast', 0.1)
+    manager.report_success('slow', 5)
+    manager.report_failure('dead')
+
+    chosen = [manager.choose() for _ in range(1000)]
+    assert 'dead' not in chosen
+    assert chosen.count('fast') > chosen.count('slow') * 5
+
+    stats = manager.stats()
+    assert stats['fast']['successes'] == 1
+    assert stats['dead']['failures'] == 1
+    assert 0 < stats['dead']['cooldown'] <= 60
+
+    # Время исключения удваивается при ошибках подряд
+    manager.report_failure('dead')
+    assert 60 < manager.stats()['dead']['cooldown'] <= 120
+
+    # Если все proxy исключены, выбирается освобождающийся раньше
+    manager = ProxyManager(['a', 'b'], cooldown=60)
+    manager.report_failure('a')
+    manager.report_failure('b')
+    manager.report_failure('b')
+    assert manager.choose() == 'a'
+
+
+def test_fetch_policy():
+    """
+    Тест политики запросов: повторы, автоматический выключатель, ограничение времени
+    """
+    breaker = CircuitBreaker(threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    time.sleep(0.06)
+    # Разрешается только один пробный запрос
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    # Неиспользованный пробный запрос освобождается
+    breaker.release()
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    policy = FetchPolicy(connect_timeout=5, read_timeout=10, retries=2, retry_backoff=0.01, breaker_threshold=3)
+    assert policy.get_timeout() == (5, 10)
+    assert policy.get_timeout(time.monotonic() - 1) is None
+    assert policy.get_timeout(time.monotonic() + 1)[1] <= 1
+
+    # Временные ошибки повторяются
+    html = '<a href="http://a.ru/1">1</a>'
+    session = FakeSession([requests.ConnectionError(), FakeResponse(status_code=503), FakeResponse(html)])
+    link_search = LinkSearch(sessions=FakeSessionPool(session), policy=policy)
+    assert link_search.get_site_links('http://a.ru') == ['http://a.ru/1']
+    assert len(session.requests) == 3
+
+    # После threshold ошибок подряд запросы к хосту не выполняются
+    session = FakeSession([requests.Timeout()] * 3)
+    link_search = LinkSearch(sessions=FakeSessionPool(session), policy=policy)
+    assert link_search.get_site_links('http://b.ru') == []
+    assert link_search.get_site_links('http://b.ru') == []
+    assert len(session.requests) == 3
+
+    # Ошибки запроса, не связанные с хостом, не размыкают выключатель
+    session = FakeSession([requests.exceptions.InvalidURL()] * 3 + [FakeResponse(html)])
+    link_search = LinkSearch(sessions=FakeSessionPool(session), policy=policy)
+    for _ in range(3):
+        assert link_search.get_site_links('http://c.ru') == []
+    assert policy.get_breaker('c.ru').state == CircuitBreaker.CLOSED
+    assert link_search.get_site_links('http://c.ru') == ['http://a.ru/1']
+
+    # Поиск не выполняет запросы после истечения времени
+    policy = FetchPolicy(search_timeout=0)
+    session = FakeSession([])
+    link_search = LinkSearch(sessions=FakeSessionPool(session), policy=policy)
+    assert link_search.get_search_links('wiki', 5, deep=True) == []
+    assert session.requests == []
+
+
+def test_rate_limiter():
+    """
+    Тест ограничения частоты запросов к хостам
+    """
+    bucket = TokenBucket(10, capacity=2)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert 0.09 < bucket.reserve() <= 0.1
+
+    # Токен не забирается, если ждать нужно дольше допустимого
+    assert bucket.reserve(max_wait=0.1) is None
+    assert not bucket.acquire(max_wait=0)
+
+    with pytest.raises(ValueError):
+        TokenBucket(0)
+
+    limiter = HostRateLimiter({'yandex.ru': 5})
+    assert limiter.get_rate('yandex.ru') == 5
+    assert limiter.get_rate('www.yandex.ru') == 5
+    assert limiter.get_rate('notyandex.ru') is None
+    assert limiter.get_bucket('https://www.yandex.ru/search/') is limiter.get_bucket('https://yandex.ru/')
+    assert limiter.get_bucket('https://google.com/') is None
+
+    # Запросы из нескольких потоков и асинхронных задач разделяют одно ведро
+    start_time = time.monotonic()
+    threads = [threading.Thread(target=limiter.acquire, args=('https://yandex.ru/',)) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+
+    async def acquire_many():
+        await asyncio.gather(*[limiter.acquire_async('https://yandex.ru/') for _ in range(5)])
+
+    asyncio.run(acquire_many())
+    for thread in threads:
+        thread.join()
+    assert time.monotonic() - start_time >= 0.9
+
+    # Запрос к поисковой системе не выполняется, если до окончания поиска его нельзя выполнить
+    limiter = HostRateLimiter({'yandex.ru': 0.1})
+    session = FakeSession([FakeResponse('<a href="http://site.ru">site</a>')] * 2)
+    link_search = LinkSearch(sessions=FakeSessionPool(session), rate_limiter=limiter,
+                             policy=FetchPolicy(search_timeout=1))
+    assert link_search.get_site_links('https://yandex.ru/search/') == ['http://site.ru']
+    assert link_search.get_site_links('https://yandex.ru/search/', deadline=time.monotonic() + 1) == []
+    assert len(session.requests) == 1
+
+    # Невыполненный из-за ограничения частоты запрос не занимает пробный запрос выключателя
+    policy = FetchPolicy(retries=0, breaker_threshold=1, breaker_timeout=0)
+    session = FakeSession([requests.ConnectionError()])
+    link_search = LinkSearch(sessions=FakeSessionPool(session), rate_limiter=HostRateLimiter({'yandex.ru': 0.2}),
+                             policy=policy)
+    assert link_search.get_site_links('https://yandex.ru/search/') == []
+    assert link_search.get_site_links('https://yandex.ru/search/', deadline=time.monotonic() + 1) == []
+    assert len(session.requests) == 1
+    breaker = policy.get_breaker('yandex.ru')
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+
+
+def test_metrics():
+    """
+    Тест метрик загрузки страниц
+    """
+    metrics = Metrics()
+    traces = []
+    metrics.add_listener(traces.append)
+
+    html = '<a href="http://site.ru/1">1</a><a href="http://site.ru/2">2</a>'
+    session = FakeSession([requests.ConnectionError(), FakeResponse(html)])
+    link_search = LinkSearch(sessions=FakeSessionPool(session), metrics=metrics,
+                             policy=FetchPolicy(retry_backoff=0))
+    assert link_search.get_site_links('http://site.ru') == ['http://site.ru/1', 'http://site.ru/2']
+
+    trace, = traces
+    assert trace.url == 'http://site.ru'
+    assert trace.attempts == 2
+    assert trace.status_code == 200
+    assert trace.errors == ['ConnectionError']
+    assert trace.links == 2
+    assert trace.received == len(html)
+    assert trace.total_time >= trace.parse_time
+
+    assert metrics.get('link_search_pages_total') == 1
+    assert metrics.get('link_search_errors_total', error='ConnectionError') == 1
+    assert metrics.get('link_search_retries_total') == 1
+    assert metrics.get('link_search_responses_total', code='200') == 1
+    assert metrics.get('link_search_links_total') == 2
+    assert metrics.get('link_search_page_links') == 1
+
+    text = metrics.to_prometheus()
+    assert '# TYPE link_search_pages_total counter' in text
+    assert 'link_search_errors_total{error="ConnectionError"} 1' in text
+    assert 'link_search_page_links_bucket{le="1"} 0' in text
+    assert 'link_search_page_links_bucket{le="5"} 1' in text
+    assert 'link_search_page_links_bucket{le="+Inf"} 1' in text
+    assert 'link_search_page_links_count 1' in text
+
+
+def test_user_agent_pool(tmp_path):
+    """
+    Тест набора User-Agent
+    """
+    # Набор загружается из файла пакета при первом обращении
+    pool = UserAgentPool(cache_path=str(tmp_path / 'user_agents.txt'))
+    user_agent = pool.random
+    assert user_agent.startswith('Mozilla/5.0')
+
+    # Актуальный дисковый кэш используется вместо файла пакета
+    (tmp_path / 'user_agents.txt').write_text('Test agent\n', encoding='utf-8')
+    assert UserAgentPool(cache_path=str(tmp_path / 'user_agents.txt')).random == 'Test agent'
+    assert UserAgentPool(cache_path=str(tmp_path / 'user_agents.txt'), cache_ttl=0).random != 'Test agent'
+
+    # Пустой дисковый кэш не используется
+    (tmp_path / 'empty.txt').write_text(' \n\n', encoding='utf-8')
+    assert UserAgentPool(cache_path=str(tmp_path / 'empty.txt')).random.startswith('Mozilla/5.0')
+
+    # Создание LinkSearch не загружает набор
+    start_time = time.perf_counter()
+    LinkSearch()
+    assert time.perf_counter() - start_time < 0.1
+
+
+@pytest.fixture(scope='module')
+def local_server():
+    """
+    Локальный сервер, имитирующий поисковую выдачу и сайты
+    """
+    with LocalSearchServer(latency=0.01, page_size=10000, results_per_page=5, search_pages=3) as server:
+        yield server
+
+
+def test_local_search(local_server):
+    """
+    Тест поиска (обычный + глубокий) на локальном сервере
+    """
+    link_search = LinkSearch(search_params=local_server.search_params)
+
+    search_links = link_search.get_search_links('wiki', 12)
+    assert len(search_links) == 12
+    assert all(link.startswith(f'{local_server.url}/site/wiki-') for link in search_links)
+
+    # Поисковая выдача закончилась раньше
+    assert len(link_search.get_search_links('wiki', 100)) == 15
+
+    search_links_deep = link_search.get_search_links('wiki', 30, True)
+    assert len(search_links_deep) == 30
+    assert len(set(search_links_deep)) == 30
+    assert set(search_links_deep) - set(search_links)
+
+    crawl_links = link_search.crawl('wiki', 50, depth=2, host_delay=0)
+    assert len(crawl_links) == 50
+    assert len(set(crawl_links)) == 50
+
+    # Результатов поиска хватило бы на весь результат, но обход начинается с seed_count из них
+    # (по умолчанию DEFAULT_CRAWL_SEED_COUNT), остальные ссылки находятся на сайтах
+    all_search_links = link_search.get_search_links('wiki', 100)
+    crawl_links = link_search.crawl('wiki', 12, depth=2, host_delay=0)
+    assert crawl_links[:DEFAULT_CRAWL_SEED_COUNT] == all_search_links[:DEFAULT_CRAWL_SEED_COUNT]
+    assert len(set(crawl_links[DEFAULT_CRAWL_SEED_COUNT:]) - set(all_search_links)) == 2
+
+    crawl_links = link_search.crawl('wiki', 12, depth=2, host_delay=0, seed_count=3)
+    assert crawl_links[:3] == all_search_links[:3]
+    assert len(set(crawl_links[3:]) - set(all_search_links)) == 9
+
+    # Обход из асинхронного кода
+    async def crawl():
+        return link_search.crawl('wiki', 10, depth=2, host_delay=0)
+
+    assert len(asyncio.run(crawl())) == 10
+    link_search.close()
+
+
+def test_batch_search(local_server):
+    """
+    Тест одновременного поиска по нескольким строкам
+    """
+    # Сайты, найденные несколькими поисками, загружаются один раз
+    search_url = YANDEX_SEARCH_PARAMS['url']
+    search_page = ''.join(f'<a class="{YANDEX_SEARCH_PARAMS["link_class"]}" href="http://site.ru/{idx}">{idx}</a>'
+                          for idx in range(3))
+    responses = {search_url.format(text, 0): FakeResponse(search_page) for text in ('wiki', 'python')}
+    responses.update({f'http://site.ru/{idx}': FakeResponse(f'<a href="http://site.ru/{idx}/page">page</a>')
+                      for idx in range(3)})
+    session = FakeSession(responses)
+    link_search = LinkSearch(sessions=FakeSessionPool(session))
+
+    results = dict(link_search.iter_batch_search_links(['wiki', 'python', 'wiki'], 6, deep=True))
+    assert sorted(results) == ['python', 'wiki']
+    for links in results.values():
+        assert sorted(links) == sorted([f'http://site.ru/{idx}' for idx in range(3)] +
+                                       [f'http://site.ru/{idx}/page' for idx in range(3)])
+    assert sorted(url for url in session.urls if 'site.ru' in url) == [f'http://site.ru/{idx}' for idx in range(3)]
+
+    # Результаты возвращаются по мере готовности, остановка генератора отменяет оставшиеся поиски
+    link_search = LinkSearch(search_params=local_server.search_params)
+    results = link_search.iter_batch_search_links([f'query{idx}' for idx in range(5)], 5, rate=100)
+    search_string, links = next(results)
+    assert search_string.startswith('query')
+    assert len(links) == 5
+    results.close()
+    link_search.close()
@@ -10,14 +10,52 @@ import random
 from lotto_game.constants import MIN_NUMBER, MAX_NUMBER, CARD_ROW_COUNT, CARD_COL_COUNT, X_NUMBER, NUMBERS_IN_ROW
 
 
+def number_bit(number) -> int:
+    """
+    Возвращает бит числа в битовой маске чисел (бит с номером, равным числу)
+    :param number: Число
+    :return: Бит или 0, если число не может быть на карточке
+    """
+    if isinstance(number, int) and MIN_NUMBER <= number <= MAX_NUMBER:
+        return 1 << number
+    return 0
+
+
+def get_column(number: int) -> int:
+    """
+    Возвращает столбец карточки для числа.
+    Числа распределяются по столбцам десятками: 1 столбец - от 1 до 9, 2-ой - от 10 до 19, и т.д.
+    В последний столбец помещаются все числа, которые не влезают в заданное количество столбцов.
+    :param number: Число
+    :return: Номер столбца
+    """
+    return (number // 10) if number < CARD_COL_COUNT * 10 else (CARD_COL_COUNT - 1)
+
+
+# Числа каждого столбца карточки
+COLUMN_NUMBERS = [[number for number in range(MIN_NUMBER, MAX_NUMBER + 1) if get_column(number) == column]
+                  for column in range(CARD_COL_COUNT)]
+
+
 class Card:
     """
-    Карточка
+    Карточка.
+    Незакрашенные числа хранятся также в виде битовой маски и словаря число -> позиция на карточке,
+    поэтому проверка и закраска числа выполняются за O(1).
     """
     def __init__(self, numbers):
         # Числа, двумерный массив
         self.__numbers = copy.deepcopy(numbers)
 
+        # Незакрашенные числа: число -> (строка, столбец) и битовая маска
+        self.__positions = {}
+        self.__numbers_mask = 0
+        for row_idx, row in enumerate(self.__numbers):
+            for col_idx, number in enumerate(row):
+                if number not in [None, X_NUMBER]:
+                    self.__positions[number] = (row_idx, col_idx)
+                    self.__numbers_mask |= number_bit(number)
+
     @property
     def numbers(self) -> list:
         """
@@ -32,7 +70,15 @@ class Card:
         Возвращает множество чисел на карточке
         :return: Числа
         """
-        return set(number for row in self.__numbers for number in row if number not in [None, X_NUMBER])
+        return set(self.__positions)
+
+    @property
+    def numbers_mask(self) -> int:
+        """
+        Возвращает битовую маску незакрашенных чисел на карточке (бит с номером, равным числу)
+        :return: Маска
+        """
+        return self.__numbers_mask
 
     def contains(self, number: int) -> bool:
         """
@@ -40,17 +86,18 @@ class Card:
         :param number: Число
         :return: Содержит ли его
         """
-        return number in self.numbers_set
+        return bool(self.__numbers_mask & number_bit(number))
 
     def mark_number(self, number: int):
         """
         Закрашивает число на карточке
         :param number: Число
         """
-        for row in range(CARD_ROW_COUNT):
-            for col in range(CARD_COL_COUNT):
-                if self.__numbers[row][col] == number:
-                    self.__numbers[row][col] = X_NUMBER
+        position = self.__positions.pop(number, None)
+        if position is not None:
+            row, col = position
+            self.__numbers[row][col] = X_NUMBER
+            self.__numbers_mask &= ~number_bit(number)
 
     @staticmethod
     def get_copy(card):
@@ -66,56 +113,34 @@ class Cards:
     """
     Хранит карточки и генерирует новые карточки.
     """
-    def __init__(self):
-        self.__cards = []
+    def __init__(self, rng: random.Random = None):
+        """
+        :param rng: Генератор случайных чисел. По умолчанию - общий генератор модуля random.
+        """
+        self.__rng = rng or random
+
+        # Выданные карточки (все числа карточки по строкам) для исключения повторов
+        self.__issued = set()
 
     def get_card(self):
         """
         Генерация карточки
         3 строки, 9 столбцов. 5 чисел в каждой строке. Карточки не должны повторяться.
+        Для каждой строки выбираются столбцы, затем для каждого столбца - различные числа из его десятка,
+        поэтому карточка генерируется без повторных попыток (кроме совпадения с уже выданной карточкой).
         :return: Новая карточка
         """
         while True:
-            card = []
-            for row in range(CARD_ROW_COUNT):
-                card.append([None] * CARD_COL_COUNT)
-            used_numbers = []
-            for row in range(CARD_ROW_COUNT):
-                col_filled = 0
-                while col_filled < NUMBERS_IN_ROW:
-                    number = random.randint(MIN_NUMBER, MAX_NUMBER)
-                    if number not in used_numbers:
-                        # Распределяем числа по столбцам десятками:
-                        # 1 столбец - от 1 до 9, 2-ой - от 10 до 19, и т.д. В последний столбец помещаем все числа,
-                        # которые не влезают в заданное количество столбцов.
-                        column = (number // 10) if number < CARD_COL_COUNT * 10 else (CARD_COL_COUNT - 1)
-                        if card[row][column] is not None:
-                            continue
-
-                        used_numbers.append(number)
-                        col_filled += 1
-                        card[row][column] = number
-
-            exists_similar = False
-            for existing_card in self.__cards:
-                if self.__similar_cards(card, existing_card):
-                    exists_similar = True
-                    break
-
-            if not exists_similar:
+            card = [[None] * CARD_COL_COUNT for _ in range(CARD_ROW_COUNT)]
+            rows = [self.__rng.sample(range(CARD_COL_COUNT), NUMBERS_IN_ROW) for _ in range(CARD_ROW_COUNT)]
+            for column in range(CARD_COL_COUNT):
+                column_rows = [row for row in range(CARD_ROW_COUNT) if column in rows[row]]
+                for row, number in zip(column_rows, self.__rng.sample(COLUMN_NUMBERS[column], len(column_rows))):
+                    card[row][column] = number
+
+            key = tuple(number for row in card for number in row)
+            if key not in self.__issued:
+                self.__issued.add(key)
                 break
 
         return Card(card)
-
-    @staticmethod
-    def __similar_cards(card1, card2) -> bool:
-        """
-        Сравнивает 2 карточки
-        :param card1: Карточка 1
-        :param card2: Карточка 2
-        :return: Одинаковые или нет
-        """
-        if [card1[row][col] for row in range(CARD_ROW_COUNT) for col in range(CARD_COL_COUNT)] == \
-                [card2[row][col] for row in range(CARD_ROW_COUNT) for col in range(CARD_COL_COUNT)]:
-            return True
-        return False
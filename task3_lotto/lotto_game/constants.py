@@ -30,3 +30,15 @@ PERSON_COUNT = 1
 
 # Количество игроков-компьютеров
 COMPUTER_COUNT = 1
+
+# Количество игроков-компьютеров при моделировании игр
+SIMULATION_COMPUTER_COUNT = 2
+
+# Количество игр, моделируемых одновременно
+SIMULATION_BATCH_SIZE = 50000
+
+# Количество игр в одной части турнира (выполняется одним процессом)
+TOURNAMENT_SHARD_SIZE = 100000
+
+# Время ожидания ходов игроков на одном ходе игры на сервере, в секундах
+SERVER_TURN_TIMEOUT = 5
@@ -17,25 +17,31 @@ class Game:
     Игра
     """
     def __init__(self, person_count=PERSON_COUNT, computer_count=COMPUTER_COUNT, input_output=InputOutput,
-                 computer_mistake_chance=COMPUTER_MISTAKE_CHANCE):
+                 computer_mistake_chance=COMPUTER_MISTAKE_CHANCE, seed=None):
         """
         :param person_count: Количество игроков-человек
         :param computer_count: Количество игроков-компьютеров
-        :param input_output: Класс ввода/вывода
+        :param input_output: Класс ввода/вывода (get_step, print_message, print_card; flush - если вывод буферизуется)
         :param computer_mistake_chance: Вероятность совершить игроку-компьютеру ошибку
+        :param seed: Начальное значение генератора случайных чисел. Игры с одинаковым seed (и одинаковыми ходами
+                     игроков-человек) повторяются в точности: порядок ходов, карточки, числа, ошибки компьютеров.
         """
         self.__person_count = person_count
         self.__computer_count = computer_count
         self.__input_output = input_output
         self.__computer_mistake_chance = computer_mistake_chance
+        self.__seed = seed
 
     def play(self) -> dict:
         """
         Игровой процесс
         :return: Выигравшие/проигравшие игроки
         """
+        # Все случайные события игры определяются одним генератором
+        rng = random.Random(self.__seed)
+
         # Создаем ведущего
-        master = Master()
+        master = Master(rng=rng)
 
         # Создаем игроков
         players = []
@@ -45,10 +51,10 @@ class Game:
 
         for computer_idx in range(self.__computer_count):
             name = 'Компьютер' + (f' {computer_idx + 1}' if self.__computer_count > 1 else '')
-            players.append(Computer(name, self.__computer_mistake_chance))
+            players.append(Computer(name, self.__computer_mistake_chance, rng))
 
         # Определяем порядок ходов
-        random.shuffle(players)
+        rng.shuffle(players)
 
         # Выдаем игрокам карточки
         for player in players:
@@ -90,6 +96,9 @@ class Game:
                     result['win'].append(player)
                     game_over = True
 
+            # Выводим ход игры одной записью
+            self.__flush()
+
             # Завершаем игру, если кто-то проиграл или выиграл
             if game_over:
                 break
@@ -101,4 +110,14 @@ class Game:
             for player in result['win']:
                 self.__input_output.print_message(f'Игрок {player.get_name()} выиграл.')
 
+            self.__flush()
+
         return result
+
+    def __flush(self):
+        """
+        Выводит накопленный текст, если класс ввода/вывода буферизует вывод (метод flush необязателен)
+        """
+        flush = getattr(self.__input_output, 'flush', None)
+        if flush is not None:
+            flush()
@@ -4,14 +4,83 @@
 
 __author__ = 'Игнатьев И.В.'
 
+import sys
+import weakref
+
 from lotto_game.cards import Card
-from lotto_game.constants import X_NUMBER
+from lotto_game.constants import MAX_NUMBER, X_NUMBER
+
+# Отображение ячеек карточки: число -> текст, закрашенное число и пустая ячейка
+CELLS = tuple(str(number).rjust(2) for number in range(MAX_NUMBER + 1))
+X_CELL = 'X'.rjust(2)
+EMPTY_CELL = ' .'
+
+
+class CardRenderer:
+    """
+    Формирует текст карточек. Текст каждой карточки запоминается; после закраски чисел
+    (определяется по изменению битовой маски карточки) обновляются только ячейки закрашенных чисел.
+    """
+    def __init__(self):
+        # Карточка -> состояние отображения
+        self.__cards = weakref.WeakKeyDictionary()
+
+    def render(self, card: Card) -> str:
+        """
+        Возвращает текст карточки
+        :param card: Карточка
+        :return: Текст (строки карточки)
+        """
+        state = self.__cards.get(card)
+        if state is None:
+            state = self.__cards[card] = self.__create_state(card)
+
+        # Закрашенные после предыдущего вывода числа
+        changed = state['mask'] & ~card.numbers_mask
+        if changed:
+            rows = set()
+            while changed:
+                bit = changed & -changed
+                changed ^= bit
+                row, col = state['positions'][bit.bit_length() - 1]
+                state['cells'][row][col] = X_CELL
+                rows.add(row)
+            for row in rows:
+                state['rows'][row] = '  '.join(state['cells'][row])
+            state['text'] = '\n'.join(state['rows'])
+            state['mask'] = card.numbers_mask
+        return state['text']
+
+    @staticmethod
+    def __create_state(card: Card) -> dict:
+        """
+        Формирует текст карточки целиком
+        :param card: Карточка
+        :return: Состояние: маска выведенных чисел, позиции чисел, ячейки, строки, текст
+        """
+        positions = {}
+        cells = []
+        for row_idx, row in enumerate(card.numbers):
+            cells.append([EMPTY_CELL if number is None else X_CELL if number == X_NUMBER else CELLS[number]
+                          for number in row])
+            for col_idx, number in enumerate(row):
+                if number not in [None, X_NUMBER]:
+                    positions[number] = (row_idx, col_idx)
+
+        rows = ['  '.join(row) for row in cells]
+        return {'mask': card.numbers_mask, 'positions': positions, 'cells': cells, 'rows': rows,
+                'text': '\n'.join(rows)}
 
 
 class InputOutput:
     """
-    Ввод/вывод
+    Ввод/вывод.
+    Сообщения и карточки накапливаются в буфере и выводятся одной записью при вызове flush
+    (ведущий вызывает flush после каждого хода игры, ввод хода выводит буфер перед запросом).
     """
+    __buffer = []
+    __renderer = CardRenderer()
+
     @staticmethod
     def get_step(number):
         """
@@ -21,6 +90,7 @@ class InputOutput:
         """
         while True:
             InputOutput.print_message(f'Число {number} есть на карточке? Введите +/-:')
+            InputOutput.flush()
             answer = input()
             if answer in ['+', '-']:
                 break
@@ -33,7 +103,7 @@ class InputOutput:
         Вывод сообщения на экран
         :param message: сообщение
         """
-        print(f'\n{message}')
+        InputOutput.__buffer.append(f'\n{message}\n')
 
     @staticmethod
     def print_card(card: Card):
@@ -41,6 +111,14 @@ class InputOutput:
         Выводит карточку на экран
         :param card: карточка
         """
-        for row in card.numbers:
-            print('  '.join([(str(number) if number != X_NUMBER else 'X').rjust(2) if number is not None
-                             else ' .' for number in row]))
+        InputOutput.__buffer.append(InputOutput.__renderer.render(card) + '\n')
+
+    @staticmethod
+    def flush():
+        """
+        Выводит накопленный текст одной записью
+        """
+        if InputOutput.__buffer:
+            sys.stdout.write(''.join(InputOutput.__buffer))
+            InputOutput.__buffer.clear()
+        sys.stdout.flush()
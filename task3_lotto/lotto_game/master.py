@@ -4,9 +4,10 @@
 
 __author__ = 'Игнатьев И.В.'
 
+from array import array
 import random
 
-from lotto_game.cards import Cards, Card
+from lotto_game.cards import Cards, Card, number_bit
 from lotto_game.constants import MIN_NUMBER, MAX_NUMBER
 from lotto_game.players import Player
 
@@ -14,18 +15,39 @@ from lotto_game.players import Player
 class Master:
     """
     Ведущий. Генерирует последовательность выпавших чисел. Раздает карточки игрокам. Проверяет ходы.
+    Порядок чисел определяется заранее перемешиванием массива, поэтому очередное число выдается за O(1),
+    а при одинаковом seed игра повторяется в точности.
+    Для каждого числа хранится список карточек, на которых оно есть, и для каждой карточки - количество
+    еще не выпавших чисел, поэтому очередное число затрагивает только карточки с этим числом,
+    а выигравшие карточки определяются по обнулению счетчика.
     """
-    def __init__(self):
-        # Номера, которые еще не выпали
+    def __init__(self, seed=None, rng: random.Random = None):
+        """
+        :param seed: Начальное значение генератора случайных чисел (для повтора игры)
+        :param rng: Генератор случайных чисел (если задан, seed не используется)
+        """
+        self.__rng = rng or random.Random(seed)
+
+        # Порядок выпадения чисел и количество выпавших чисел
         self.__numbers = None
+        self.__position = 0
 
-        # Выпавшие номера
-        self.__played_numbers = []
+        # Битовая маска выпавших чисел
+        self.__played_mask = 0
 
         # Карточки
-        self.__cards = Cards()
+        self.__cards = Cards(self.__rng)
         self.__player_cards = {}
 
+        # Число -> список (идентификатор игрока, строка, столбец) карточек с этим числом
+        self.__holders = {}
+
+        # Идентификатор игрока -> количество еще не выпавших чисел карточки
+        self.__remaining = {}
+
+        # Игроки, у которых выпали все числа карточки на последнем ходе
+        self.__completed = []
+
     @property
     def player_cards(self) -> dict:
         """
@@ -34,16 +56,54 @@ class Master:
         """
         return self.__player_cards
 
+    @property
+    def played_numbers(self) -> list:
+        """
+        Возвращает выпавшие числа в порядке выпадения
+        :return: Числа
+        """
+        return list(self.__numbers[:self.__position]) if self.__numbers is not None else []
+
+    @property
+    def completed_players(self) -> list:
+        """
+        Возвращает игроков, у которых выпали все числа карточки на последнем ходе
+        :return: Идентификаторы игроков
+        """
+        return self.__completed
+
+    def get_holders(self, number: int) -> list:
+        """
+        Возвращает карточки, на которых есть число
+        :param number: Число
+        :return: Список (идентификатор игрока, строка, столбец)
+        """
+        return self.__holders.get(number, [])
+
     def get_number_sequence(self):
         """
         Генератор последовательности чисел
         """
-        self.__numbers = list(range(MIN_NUMBER, MAX_NUMBER + 1))
-        while self.__numbers:
-            idx = random.randint(0, len(self.__numbers) - 1)
-            number = self.__numbers[idx]
-            self.__numbers.pop(idx)
-            self.__played_numbers.append(number)
+        # Перемешиваем все числа сразу (алгоритм Фишера-Йетса), далее выдаем их по порядку
+        self.__numbers = array('B' if MAX_NUMBER <= 0xFF else 'H', range(MIN_NUMBER, MAX_NUMBER + 1))
+        self.__rng.shuffle(self.__numbers)
+        self.__position = 0
+        self.__played_mask = 0
+        self.__completed = []
+        for player_id, card in self.__player_cards.items():
+            self.__remaining[player_id] = bin(card.numbers_mask).count('1')
+
+        while self.__position < len(self.__numbers):
+            number = self.__numbers[self.__position]
+            self.__position += 1
+            self.__played_mask |= number_bit(number)
+
+            # Уменьшаем счетчики только у карточек с выпавшим числом
+            self.__completed = []
+            for player_id, _, _ in self.__holders.get(number, []):
+                self.__remaining[player_id] -= 1
+                if not self.__remaining[player_id]:
+                    self.__completed.append(player_id)
             yield number
 
     def give_card(self, player: Player):
@@ -55,6 +115,12 @@ class Master:
         player.card = card
         self.__player_cards[player.id] = Card.get_copy(card)
 
+        for row_idx, row in enumerate(card.numbers):
+            for col_idx, number in enumerate(row):
+                if number is not None:
+                    self.__holders.setdefault(number, []).append((player.id, row_idx, col_idx))
+        self.__remaining[player.id] = bin(card.numbers_mask & ~self.__played_mask).count('1')
+
     def check_step(self, player: Player, number: int, step: bool) -> dict:
         """
         Проверяет ход игрока (выиграл/совершил ошибку/нейтральный ход).
@@ -69,5 +135,24 @@ class Master:
         card_contains_number = card.contains(number)
         return {
             'mistake': step and not card_contains_number or not step and card_contains_number,
-            'win': not (card.numbers_set - set(self.__played_numbers))
+            'win': not self.__remaining[player.id]
+        }
+
+    def check_steps(self, steps: dict, number: int) -> dict:
+        """
+        Проверяет ходы всех игроков на выпавшее число
+        :param steps: Идентификатор игрока -> ход
+        :param number: Последнее выпавшее число
+        :return: Результат:
+                    mistake (list) - идентификаторы игроков, совершивших ошибку
+                    win (list) - идентификаторы выигравших игроков (без ошибки)
+        """
+        holders = set(player_id for player_id, _, _ in self.__holders.get(number, []))
+        mistakes = [player_id for player_id, step in steps.items() if step != (player_id in holders)]
+        mistakes_set = set(mistakes)
+
+        # Выиграть могли только игроки, у которых на этом ходе обнулился счетчик
+        return {
+            'mistake': mistakes,
+            'win': [player_id for player_id in self.__completed if player_id in steps and player_id not in mistakes_set]
         }
@@ -108,13 +108,15 @@ class Computer(Player):
     """
     Компьютер-игрок
     """
-    def __init__(self, name, mistake_chance):
+    def __init__(self, name, mistake_chance, rng: random.Random = None):
         """
         :param name: Имя
         :param mistake_chance: Вероятность ошибки в процентах
+        :param rng: Генератор случайных чисел. По умолчанию - общий генератор модуля random.
         """
         super().__init__(name)
         self.__mistake_chance = mistake_chance
+        self.__rng = rng or random
 
     def make_step(self, number):
         """
@@ -123,7 +125,7 @@ class Computer(Player):
         :return: Закрашивает или нет
         """
         contains = self.card.contains(number)
-        step = not contains if self.__mistake_chance and random.randint(1, 100 // self.__mistake_chance) == 1 \
+        step = not contains if self.__mistake_chance and self.__rng.randint(1, 100 // self.__mistake_chance) == 1 \
             else contains
         if step:
             self.card.mark_number(number)
@@ -0,0 +1,312 @@
+"""
+Сервер игры для большого количества игроков (asyncio).
+Игроки подключаются через соединения: локальные (игроки-компьютеры в том же процессе) или TCP.
+"""
+
+__author__ = 'Игнатьев И.В.'
+
+from abc import ABC, abstractmethod
+import asyncio
+import json
+
+from lotto_game.cards import Card
+from lotto_game.constants import SERVER_TURN_TIMEOUT
+from lotto_game.master import Master
+from lotto_game.players import Player, Computer
+
+
+class RemotePlayer(Player):
+    """
+    Игрок, подключенный к серверу по сети. Ход игрока получается через соединение (set_step),
+    затем выполняется на карточке сервера (make_step), как у локальных игроков.
+    """
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__step = False
+
+    def set_step(self, step: bool):
+        """
+        Запоминает ход, полученный от игрока
+        :param step: Закрашивает или нет
+        """
+        self.__step = step
+
+    def make_step(self, number) -> bool:
+        """
+        Ход, полученный от игрока
+        :param number: Число
+        :return: Закрашивает или нет
+        """
+        step = self.__step
+        self.__step = False
+        if step:
+            self.card.mark_number(number)
+        return step
+
+
+class Connection(ABC):
+    """
+    Соединение сервера с игроком. Сообщения - словари:
+        сервер -> игрок: {'type': 'card', 'numbers': [...]}, {'type': 'number', 'turn': N, 'number': N},
+                         {'type': 'result', 'result': 'win' | 'mistake' | 'lose'}
+        игрок -> сервер: {'type': 'move', 'turn': N, 'step': bool}
+    """
+    def __init__(self, player: Player):
+        """
+        :param player: Игрок
+        """
+        self.player = player
+
+    @abstractmethod
+    async def send(self, message: dict):
+        """
+        Отправляет сообщение игроку
+        :param message: Сообщение
+        """
+
+    @abstractmethod
+    async def receive(self) -> dict:
+        """
+        Получает сообщение от игрока
+        :return: Сообщение или None, если соединение закрыто
+        """
+
+    async def close(self):
+        """
+        Закрывает соединение
+        """
+
+
+class LocalConnection(Connection):
+    """
+    Соединение с игроком в том же процессе (например, с игроком-компьютером).
+    Ход игрока выполняется при получении числа.
+    """
+    def __init__(self, player: Player):
+        super().__init__(player)
+        self.__messages = asyncio.Queue()
+
+    async def send(self, message: dict):
+        if message['type'] == 'number':
+            step = self.player.make_step(message['number'])
+            self.__messages.put_nowait({'type': 'move', 'turn': message['turn'], 'step': step})
+        elif message['type'] == 'result':
+            self.__messages.put_nowait(None)
+
+    async def receive(self) -> dict:
+        return await self.__messages.get()
+
+
+class TcpConnection(Connection):
+    """
+    Соединение с игроком по TCP. Сообщения передаются в формате JSON, по одному в строке.
+    """
+    def __init__(self, player: Player, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        super().__init__(player)
+        self.__reader = reader
+        self.__writer = writer
+
+    async def send(self, message: dict):
+        if self.__writer.is_closing():
+            return
+        self.__writer.write(json.dumps(message).encode('utf-8') + b'\n')
+        try:
+            await self.__writer.drain()
+        except ConnectionError:
+            self.__writer.close()
+
+    async def receive(self) -> dict:
+        return await read_message(self.__reader)
+
+    async def close(self):
+        self.__writer.close()
+
+
+async def read_message(reader: asyncio.StreamReader):
+    """
+    Читает сообщение из потока
+    :param reader: Поток
+    :return: Сообщение или None, если соединение закрыто или сообщение некорректно
+    """
+    try:
+        line = await reader.readline()
+        return json.loads(line) if line else None
+    except (ConnectionError, ValueError):
+        return None
+
+
+class GameServer:
+    """
+    Сервер игры. Ведущий выдает карточки, затем на каждом ходе отправляет выпавшее число всем игрокам
+    одновременно, ждет ходы не дольше turn_timeout секунд (не сделавший ход игрок не закрашивает число)
+    и проверяет ходы всех игроков разом.
+    В отличие от Game, ошибка игрока не завершает игру: игрок выбывает, остальные продолжают.
+    Отключившийся игрок тоже выбывает, его ход больше не ожидается.
+    Игра завершается, когда кто-нибудь выиграет (все закрывшие карточку на этом ходе) или выбудут все игроки.
+    """
+    def __init__(self, turn_timeout: float = SERVER_TURN_TIMEOUT, seed=None):
+        """
+        :param turn_timeout: Время ожидания ходов на одном ходе игры, в секундах
+        :param seed: Начальное значение генератора случайных чисел ведущего
+        """
+        self.turn_timeout = turn_timeout
+        self.__seed = seed
+        self.__connections = {}
+        self.__tcp_server = None
+
+    @property
+    def connections(self) -> dict:
+        """
+        Возвращает соединения игроков
+        :return: Идентификатор игрока -> соединение
+        """
+        return self.__connections
+
+    def add_connection(self, connection: Connection):
+        """
+        Добавляет игрока
+        :param connection: Соединение с игроком
+        """
+        self.__connections[connection.player.id] = connection
+
+    async def start_tcp(self, host: str = '127.0.0.1', port: int = 0) -> tuple:
+        """
+        Начинает прием игроков по TCP. Игрок отправляет {'type': 'join', 'name': имя}.
+        :param host: Адрес
+        :param port: Порт (0 - любой свободный)
+        :return: (адрес, порт)
+        """
+        async def accept(reader, writer):
+            message = await read_message(reader)
+            if not message or message.get('type') != 'join':
+                writer.close()
+                return
+            self.add_connection(TcpConnection(RemotePlayer(str(message.get('name', ''))), reader, writer))
+
+        self.__tcp_server = await asyncio.start_server(accept, host, port)
+        return self.__tcp_server.sockets[0].getsockname()[:2]
+
+    async def play(self) -> dict:
+        """
+        Игровой процесс
+        :return: Результат: win, mistake, disconnected (отключившиеся во время игры) - списки идентификаторов
+                 игроков, turns - количество ходов
+        """
+        # Новые игроки после начала игры не принимаются
+        if self.__tcp_server is not None:
+            self.__tcp_server.close()
+
+        master = Master(self.__seed)
+        connections = dict(self.__connections)
+        for connection in connections.values():
+            master.give_card(connection.player)
+        await asyncio.gather(*[connection.send({'type': 'card', 'numbers': connection.player.card.numbers})
+                               for connection in connections.values()])
+
+        # Ходы текущего хода игры, собираются задачами чтения сообщений игроков
+        turn = 0
+        number = None
+        steps = {}
+        active = set(connections)
+        all_steps = asyncio.Event()
+        finished = False
+        result = {'win': [], 'mistake': [], 'disconnected': [], 'turns': 0}
+
+        def check_all_steps():
+            if active <= steps.keys():
+                all_steps.set()
+
+        async def read_steps(player_id, connection):
+            while True:
+                message = await connection.receive()
+                if message is None:
+                    # Отключившийся игрок выбывает, ход больше не ждем
+                    if not finished and player_id in active:
+                        active.discard(player_id)
+                        result['disconnected'].append(player_id)
+                        check_all_steps()
+                    return
+                if message.get('type') == 'move' and message.get('turn') == turn and player_id in active \
+                        and player_id not in steps:
+                    step = bool(message.get('step'))
+                    if isinstance(connection.player, RemotePlayer):
+                        connection.player.set_step(step)
+                        step = connection.player.make_step(number)
+                    steps[player_id] = step
+                    check_all_steps()
+
+        readers = [asyncio.ensure_future(read_steps(player_id, connection))
+                   for player_id, connection in connections.items()]
+        try:
+            for number in master.get_number_sequence():
+                turn += 1
+                steps.clear()
+                all_steps.clear()
+                await asyncio.gather(*[connections[player_id].send({'type': 'number', 'turn': turn, 'number': number})
+                                       for player_id in active])
+                try:
+                    await asyncio.wait_for(all_steps.wait(), self.turn_timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+                # Не сделавший ход игрок не закрашивает число
+                step_result = master.check_steps({player_id: steps.get(player_id, False) for player_id in active},
+                                                 number)
+                result['mistake'].extend(step_result['mistake'])
+                active.difference_update(step_result['mistake'])
+                result['turns'] = turn
+                if step_result['win'] or not active:
+                    result['win'] = step_result['win']
+                    break
+
+            finished = True
+            await asyncio.gather(*[connection.send({'type': 'result', 'result': self.__get_player_result(
+                player_id, result)}) for player_id, connection in connections.items()])
+        finally:
+            for reader in readers:
+                reader.cancel()
+            await asyncio.gather(*readers, return_exceptions=True)
+            await asyncio.gather(*[connection.close() for connection in connections.values()])
+            if self.__tcp_server is not None:
+                await self.__tcp_server.wait_closed()
+        return result
+
+    @staticmethod
+    def __get_player_result(player_id: int, result: dict) -> str:
+        """
+        Результат игрока
+        """
+        if player_id in result['win']:
+            return 'win'
+        return 'mistake' if player_id in result['mistake'] else 'lose'
+
+
+async def play_tcp_bot(host: str, port: int, name: str, mistake_chance: float = 0) -> str:
+    """
+    Игрок-компьютер, подключающийся к серверу по TCP
+    :param host: Адрес сервера
+    :param port: Порт сервера
+    :param name: Имя игрока
+    :param mistake_chance: Вероятность ошибки, в процентах
+    :return: Результат игры ('win', 'mistake', 'lose') или None, если соединение закрыто
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    player = Computer(name, mistake_chance)
+    try:
+        writer.write(json.dumps({'type': 'join', 'name': name}).encode('utf-8') + b'\n')
+        await writer.drain()
+        while True:
+            message = await read_message(reader)
+            if message is None:
+                return None
+            if message['type'] == 'card':
+                player.card = Card(message['numbers'])
+            elif message['type'] == 'number':
+                step = player.make_step(message['number'])
+                writer.write(json.dumps({'type': 'move', 'turn': message['turn'], 'step': step}).encode('utf-8')
+                             + b'\n')
+                await writer.drain()
+            elif message['type'] == 'result':
+                return message['result']
+    finally:
+        writer.close()
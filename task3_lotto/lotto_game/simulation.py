@@ -0,0 +1,240 @@
+"""
+Быстрое моделирование игр компьютеров (метод Монте-Карло).
+Карточки, последовательности чисел и ошибки игроков генерируются сразу для пакета игр средствами NumPy.
+"""
+
+__author__ = 'Игнатьев И.В.'
+
+import numpy as np
+
+from lotto_game.cards import COLUMN_NUMBERS
+from lotto_game.constants import MIN_NUMBER, MAX_NUMBER, CARD_ROW_COUNT, CARD_COL_COUNT, NUMBERS_IN_ROW, \
+    COMPUTER_MISTAKE_CHANCE, SIMULATION_COMPUTER_COUNT, SIMULATION_BATCH_SIZE
+
+# Количество чисел в игре
+NUMBER_COUNT = MAX_NUMBER - MIN_NUMBER + 1
+
+
+def get_mistake_probability(mistake_chance: float) -> float:
+    """
+    Возвращает вероятность ошибки компьютера на одном ходе (как в Computer.make_step)
+    :param mistake_chance: Вероятность ошибки в процентах
+    :return: Вероятность от 0 до 1
+    """
+    if not mistake_chance:
+        return 0.0
+    return 1 / max(1, int(100 // mistake_chance))
+
+
+def get_column_numbers() -> np.ndarray:
+    """
+    Возвращает числа столбцов карточки (как в Cards.get_card, см. get_column)
+    :return: Массив (столбец, позиция), недостающие позиции заполнены нулями
+    """
+    column_numbers = np.zeros((CARD_COL_COUNT, max(len(column) for column in COLUMN_NUMBERS)), dtype=np.int16)
+    for idx, column in enumerate(COLUMN_NUMBERS):
+        column_numbers[idx, :len(column)] = column
+    return column_numbers
+
+
+def generate_cards(rng: np.random.Generator, count: int) -> np.ndarray:
+    """
+    Генерирует карточки: в каждой строке NUMBERS_IN_ROW случайных столбцов, в каждом столбце -
+    различные случайные числа его десятка.
+    Совпадение карточек разных игроков не исключается (его вероятность пренебрежимо мала).
+    :param rng: Генератор случайных чисел
+    :param count: Количество карточек
+    :return: Числа карточек, массив (карточка, CARD_ROW_COUNT * NUMBERS_IN_ROW)
+    """
+    column_numbers = get_column_numbers()
+    column_sizes = (column_numbers > 0).sum(axis=1)
+
+    # Расположение чисел: в каждой строке выбираем NUMBERS_IN_ROW столбцов из CARD_COL_COUNT
+    columns = np.argsort(rng.random((count, CARD_ROW_COUNT, CARD_COL_COUNT)), axis=2)[:, :, :NUMBERS_IN_ROW]
+    layout = np.zeros((count, CARD_ROW_COUNT, CARD_COL_COUNT), dtype=bool)
+    np.put_along_axis(layout, columns, True, axis=2)
+
+    # Числа в столбце: CARD_ROW_COUNT различных случайных позиций столбца (выбор без возвращения:
+    # очередная позиция выбирается среди оставшихся и сдвигается через уже выбранные по возрастанию)
+    order = np.empty((count, CARD_COL_COUNT, CARD_ROW_COUNT), dtype=np.int64)
+    for idx in range(CARD_ROW_COUNT):
+        position = (rng.random((count, CARD_COL_COUNT)) * (column_sizes - idx)).astype(np.int64)
+        for taken in np.moveaxis(np.sort(order[:, :, :idx], axis=2), 2, 0):
+            position += position >= taken
+        order[:, :, idx] = position
+
+    # Порядковый номер числа в столбце = количество строк выше, в которых занят этот столбец
+    slots = np.cumsum(layout, axis=1) - 1
+    slots = np.where(layout, slots, 0)
+    column_idx = np.broadcast_to(np.arange(CARD_COL_COUNT), layout.shape)
+    slot_numbers = np.take_along_axis(order, slots.transpose(0, 2, 1), axis=2).transpose(0, 2, 1)
+    grid = column_numbers[column_idx, slot_numbers]
+    return grid[layout].reshape(count, CARD_ROW_COUNT * NUMBERS_IN_ROW)
+
+
+class SimulationStats:
+    """
+    Результаты моделирования. Результаты нескольких моделирований можно объединить (merge).
+    """
+    def __init__(self):
+        # Количество игр
+        self.games = 0
+
+        # Количество игр, завершившихся выигрышем, по номеру хода (количеству выпавших чисел), с 1
+        self.win_turns = np.zeros(NUMBER_COUNT + 1, dtype=np.int64)
+
+        # Количество игр, в которых выиграли одновременно несколько игроков
+        self.ties = 0
+
+        # Количество игр, завершившихся ошибкой, по номеру хода
+        self.mistake_turns = np.zeros(NUMBER_COUNT + 1, dtype=np.int64)
+
+    @property
+    def wins(self) -> int:
+        """
+        Количество игр, завершившихся выигрышем
+        """
+        return int(self.win_turns.sum())
+
+    @property
+    def mistakes(self) -> int:
+        """
+        Количество игр, завершившихся ошибкой
+        """
+        return int(self.mistake_turns.sum())
+
+    @property
+    def tie_rate(self) -> float:
+        """
+        Доля игр, в которых выиграли одновременно несколько игроков (среди завершившихся выигрышем)
+        """
+        return self.ties / self.wins if self.wins else 0.0
+
+    @property
+    def mistake_rate(self) -> float:
+        """
+        Доля игр, завершившихся ошибкой
+        """
+        return self.mistakes / self.games if self.games else 0.0
+
+    @property
+    def mean_win_turn(self) -> float:
+        """
+        Средний номер хода, на котором завершается игра с выигрышем
+        """
+        return float(np.arange(NUMBER_COUNT + 1) @ self.win_turns / self.wins) if self.wins else 0.0
+
+    def merge(self, other):
+        """
+        Добавляет результаты другого моделирования
+        :param other: Результаты (SimulationStats)
+        :return: self
+        """
+        self.games += other.games
+        self.win_turns += other.win_turns
+        self.ties += other.ties
+        self.mistake_turns += other.mistake_turns
+        return self
+
+    def as_dict(self) -> dict:
+        """
+        Возвращает основные показатели
+        :return: Показатели
+        """
+        return {
+            'games': self.games,
+            'wins': self.wins,
+            'mistakes': self.mistakes,
+            'ties': self.ties,
+            'tie_rate': self.tie_rate,
+            'mistake_rate': self.mistake_rate,
+            'mean_win_turn': self.mean_win_turn
+        }
+
+
+class Simulation:
+    """
+    Моделирование игр компьютеров без ввода/вывода.
+    Правила как в Game.play: ошибка игрока сразу завершает игру, при выигрыше остальные игроки доигрывают ход.
+    Если на одном ходе есть и ошибка, и выигрыш, игра считается завершенной ошибкой.
+    """
+    def __init__(self, computer_count: int = SIMULATION_COMPUTER_COUNT,
+                 computer_mistake_chance: float = COMPUTER_MISTAKE_CHANCE, seed=None,
+                 batch_size: int = SIMULATION_BATCH_SIZE):
+        """
+        :param computer_count: Количество игроков-компьютеров
+        :param computer_mistake_chance: Вероятность ошибки игрока-компьютера на одном ходе, в процентах
+        :param seed: Начальное значение генератора случайных чисел (число или np.random.SeedSequence)
+        :param batch_size: Количество игр, моделируемых одновременно (ограничивает объем памяти)
+        """
+        if not isinstance(computer_count, int) or computer_count < 1:
+            raise ValueError('Количество игроков должно быть целым положительным числом.')
+        if not isinstance(batch_size, int) or batch_size < 1:
+            raise ValueError('Размер пакета игр должен быть целым положительным числом.')
+
+        self.computer_count = computer_count
+        self.computer_mistake_chance = computer_mistake_chance
+        self.batch_size = batch_size
+        self.__rng = np.random.default_rng(seed)
+
+    def run(self, games: int) -> SimulationStats:
+        """
+        Моделирует игры
+        :param games: Количество игр
+        :return: Результаты
+        """
+        stats = SimulationStats()
+        while stats.games < games:
+            stats.merge(self.__run_batch(min(self.batch_size, games - stats.games)))
+        return stats
+
+    def __run_batch(self, games: int) -> SimulationStats:
+        """
+        Моделирует пакет игр
+        :param games: Количество игр
+        :return: Результаты
+        """
+        rng = self.__rng
+        players = self.computer_count
+
+        # Номер хода, на котором выпадает каждое число (с 1). Перестановка, обратная случайному порядку чисел,
+        # тоже случайна, поэтому номера ходов - просто случайная перестановка
+        draw_turns = np.zeros((games, NUMBER_COUNT + MIN_NUMBER), dtype=np.int16)
+        draw_turns[:, MIN_NUMBER:] = np.arange(1, NUMBER_COUNT + 1, dtype=np.int16)
+        draw_turns[:, MIN_NUMBER:] = rng.permuted(draw_turns[:, MIN_NUMBER:], axis=1)
+
+        # Игрок закрывает карточку на ходе, когда выпадает последнее из ее чисел
+        cards = generate_cards(rng, games * players).reshape(games, players * CARD_ROW_COUNT * NUMBERS_IN_ROW)
+        win_turns = np.take_along_axis(draw_turns, cards, axis=1).reshape(games, players, -1).max(axis=2)
+
+        # Ход первой ошибки каждого игрока (на каждом ходе ошибка независима)
+        probability = get_mistake_probability(self.computer_mistake_chance)
+        if probability:
+            mistake_turns = rng.geometric(probability, (games, players))
+        else:
+            mistake_turns = np.full((games, players), NUMBER_COUNT + 1)
+
+        end_turns = np.minimum(win_turns.min(axis=1), mistake_turns.min(axis=1))
+        mistake_games = mistake_turns.min(axis=1) <= end_turns
+        winners = (win_turns == end_turns[:, None]).sum(axis=1)
+
+        stats = SimulationStats()
+        stats.games = games
+        stats.win_turns = np.bincount(end_turns[~mistake_games], minlength=NUMBER_COUNT + 1).astype(np.int64)
+        stats.mistake_turns = np.bincount(end_turns[mistake_games], minlength=NUMBER_COUNT + 1).astype(np.int64)
+        stats.ties = int((winners[~mistake_games] > 1).sum())
+        return stats
+
+
+def sweep(mistake_chances, games: int, computer_count: int = SIMULATION_COMPUTER_COUNT, seed=None) -> list:
+    """
+    Моделирует игры для нескольких значений вероятности ошибки компьютера
+    :param mistake_chances: Значения вероятности ошибки, в процентах
+    :param games: Количество игр для каждого значения
+    :param computer_count: Количество игроков-компьютеров
+    :param seed: Начальное значение генератора случайных чисел
+    :return: Список (вероятность ошибки, результаты)
+    """
+    seeds = np.random.SeedSequence(seed).spawn(len(mistake_chances))
+    return [(chance, Simulation(computer_count, chance, child_seed).run(games))
+            for chance, child_seed in zip(mistake_chances, seeds)]
@@ -0,0 +1,122 @@
+"""
+Турнир: моделирование большого количества игр компьютеров с разными параметрами в нескольких процессах
+"""
+
+__author__ = 'Игнатьев И.В.'
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import csv
+import itertools
+
+import numpy as np
+
+from lotto_game.constants import COMPUTER_MISTAKE_CHANCE, SIMULATION_COMPUTER_COUNT, TOURNAMENT_SHARD_SIZE
+from lotto_game.simulation import Simulation, SimulationStats
+
+# Столбцы файла результатов
+RESULT_FIELDS = ('computer_count', 'computer_mistake_chance', 'shard', 'games', 'wins', 'mistakes', 'ties',
+                 'tie_rate', 'mistake_rate', 'mean_win_turn')
+
+
+def run_shard(computer_count: int, computer_mistake_chance: float, games: int,
+              seed: np.random.SeedSequence) -> SimulationStats:
+    """
+    Моделирует часть игр турнира (выполняется в отдельном процессе)
+    :param computer_count: Количество игроков-компьютеров
+    :param computer_mistake_chance: Вероятность ошибки игрока-компьютера, в процентах
+    :param games: Количество игр
+    :param seed: Начальное значение генератора случайных чисел части
+    :return: Результаты
+    """
+    return Simulation(computer_count, computer_mistake_chance, seed).run(games)
+
+
+class Tournament:
+    """
+    Моделирует игры для всех сочетаний параметров. Игры делятся на части по shard_size игр,
+    части выполняются в пуле процессов. У каждой части свой генератор случайных чисел, полученный из seed,
+    поэтому результаты воспроизводимы и не зависят от количества процессов и порядка завершения частей.
+    """
+    def __init__(self, computer_counts=(SIMULATION_COMPUTER_COUNT,), mistake_chances=(COMPUTER_MISTAKE_CHANCE,),
+                 games: int = 100000, shard_size: int = TOURNAMENT_SHARD_SIZE, processes: int = None, seed=None):
+        """
+        :param computer_counts: Значения количества игроков-компьютеров
+        :param mistake_chances: Значения вероятности ошибки игрока-компьютера, в процентах
+        :param games: Количество игр для каждого сочетания параметров
+        :param shard_size: Количество игр в одной части
+        :param processes: Количество процессов, по умолчанию - количество процессоров
+        :param seed: Начальное значение генератора случайных чисел
+        """
+        if not isinstance(shard_size, int) or shard_size < 1:
+            raise ValueError('Размер части должен быть целым положительным числом.')
+        if not isinstance(games, int) or games < 0:
+            raise ValueError('Количество игр должно быть целым неотрицательным числом.')
+
+        self.params = list(itertools.product(computer_counts, mistake_chances))
+        self.games = games
+        self.shard_size = shard_size
+        self.processes = processes
+        self.seed = seed
+
+    def run(self, output_path: str = None, callback=None) -> dict:
+        """
+        Проводит турнир
+        :param output_path: Путь к CSV-файлу результатов. Результат каждой части записывается по мере завершения,
+                            итоги по сочетаниям параметров (shard = 'total') - в конце.
+        :param callback: Функция callback(params, stats), вызывается после завершения каждой части
+                         с промежуточными итогами по сочетанию параметров
+        :return: (количество компьютеров, вероятность ошибки) -> результаты (SimulationStats)
+        """
+        results = {params: SimulationStats() for params in self.params}
+        output = open(output_path, 'w', newline='', encoding='utf-8') if output_path else None
+        try:
+            writer = None
+            if output is not None:
+                writer = csv.DictWriter(output, RESULT_FIELDS)
+                writer.writeheader()
+
+            with ProcessPoolExecutor(max_workers=self.processes) as executor:
+                futures = {}
+                for params, shards in zip(self.params, self.__get_shards()):
+                    for shard, (games, seed) in enumerate(shards):
+                        futures[executor.submit(run_shard, *params, games, seed)] = (params, shard)
+
+                # Результаты частей объединяются по мере завершения
+                for future in as_completed(futures):
+                    params, shard = futures[future]
+                    stats = future.result()
+                    results[params].merge(stats)
+                    if writer is not None:
+                        writer.writerow(self.__get_row(params, shard, stats))
+                        output.flush()
+                    if callback is not None:
+                        callback(params, results[params])
+
+            if writer is not None:
+                for params, stats in results.items():
+                    writer.writerow(self.__get_row(params, 'total', stats))
+        finally:
+            if output is not None:
+                output.close()
+        return results
+
+    def __get_shards(self) -> list:
+        """
+        Делит игры на части
+        :return: Для каждого сочетания параметров - список (количество игр, начальное значение генератора)
+        """
+        sizes = [self.shard_size] * (self.games // self.shard_size)
+        if self.games % self.shard_size:
+            sizes.append(self.games % self.shard_size)
+
+        return [list(zip(sizes, params_seed.spawn(len(sizes))))
+                for params_seed in np.random.SeedSequence(self.seed).spawn(len(self.params))]
+
+    @staticmethod
+    def __get_row(params: tuple, shard, stats: SimulationStats) -> dict:
+        """
+        Строка файла результатов
+        """
+        computer_count, computer_mistake_chance = params
+        return dict(stats.as_dict(), computer_count=computer_count, computer_mistake_chance=computer_mistake_chance,
+                    shard=shard)
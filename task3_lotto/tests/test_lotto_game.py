@@ -2,12 +2,17 @@
 Тесты
 """
 
+import asyncio
+import csv
+import json
+import time
+
 import pytest
 
 from lotto_game import Game
-from lotto_game.cards import Cards, Card
+from lotto_game.cards import Cards, Card, get_column
 from lotto_game.constants import MIN_NUMBER, MAX_NUMBER, CARD_ROW_COUNT, CARD_COL_COUNT, NUMBERS_IN_ROW, \
-    COMPUTER_MISTAKE_CHANCE
+    COMPUTER_MISTAKE_CHANCE, X_NUMBER
 from lotto_game.input_output import InputOutput
 from lotto_game.master import Master
 from lotto_game.players import Person, Computer
@@ -89,6 +94,48 @@ def test_cards():
     assert card1.numbers_set != card2.numbers_set
 
 
+def test_many_cards():
+    """
+    Проверяет генерацию большого количества различных карточек
+    """
+    cards = Cards()
+    keys = set()
+    for _ in range(5000):
+        card = cards.get_card()
+        keys.add(tuple(number for row in card.numbers for number in row))
+        assert len(card.numbers_set) == CARD_ROW_COUNT * NUMBERS_IN_ROW
+        for row in card.numbers:
+            assert sum(number is not None for number in row) == NUMBERS_IN_ROW
+            for column, number in enumerate(row):
+                assert number is None or get_column(number) == column
+    assert len(keys) == 5000
+
+
+def test_card_mask():
+    """
+    Проверяет битовую маску чисел карточки
+    """
+    card = Cards().get_card()
+    numbers = sorted(card.numbers_set)
+    assert card.numbers_mask == sum(1 << number for number in numbers)
+
+    # Числа, которых не может быть на карточке
+    for number in (None, X_NUMBER, MIN_NUMBER - 1, MAX_NUMBER + 1, -1):
+        assert not card.contains(number)
+
+    # Закраска числа снимает его бит, повторная закраска ничего не меняет
+    card.mark_number(numbers[0])
+    card.mark_number(numbers[0])
+    assert not card.contains(numbers[0])
+    assert card.numbers_mask == sum(1 << number for number in numbers[1:])
+    assert sum(row.count(X_NUMBER) for row in card.numbers) == 1
+
+    for number in numbers[1:]:
+        card.mark_number(number)
+    assert card.numbers_mask == 0
+    assert card.numbers_set == set()
+
+
 def test_master_numbers(master):
     """
     Проверяет последовательность чисел, произодимую ведущим
@@ -142,6 +189,84 @@ def test_check_step(master, person, computer):
         check_result = master.check_step(player, MAX_NUMBER + 1, False)
         assert not check_result['mistake']
 
+    # Выигрыш - все числа карточки выпали
+    master = Master()
+    master.give_card(person)
+    numbers = person.card.numbers_set
+    for number in master.get_number_sequence():
+        numbers.discard(number)
+        assert master.check_step(person, number, person.card.contains(number))['win'] == (not numbers)
+        if not numbers:
+            break
+
+
+def test_master_seed():
+    """
+    Проверяет повтор последовательности чисел и карточек по seed
+    """
+    master1 = Master(seed=42)
+    master2 = Master(seed=42)
+    numbers = list(master1.get_number_sequence())
+    assert numbers == list(master2.get_number_sequence())
+    assert numbers != list(Master(seed=43).get_number_sequence())
+    assert master1.played_numbers == numbers
+
+    # Выпавшие числа учитываются по мере выдачи
+    master = Master(seed=42)
+    sequence = master.get_number_sequence()
+    assert [next(sequence) for _ in range(3)] == master.played_numbers == numbers[:3]
+
+    person1 = Person('Человек', input_output=None)
+    person2 = Person('Человек', input_output=None)
+    master1.give_card(person1)
+    master2.give_card(person2)
+    assert person1.card.numbers == person2.card.numbers
+
+
+def test_master_index():
+    """
+    Проверяет индекс карточек по числам и определение выигравших
+    """
+    master = Master(seed=7)
+    players = [Computer(f'Компьютер {idx}', mistake_chance=0) for idx in range(50)]
+    for player in players:
+        master.give_card(player)
+
+    for number in range(MIN_NUMBER, MAX_NUMBER + 1):
+        holders = master.get_holders(number)
+        assert sorted(player_id for player_id, _, _ in holders) == \
+            sorted(player.id for player in players if player.card.contains(number))
+        for player_id, row, col in holders:
+            assert master.player_cards[player_id].numbers[row][col] == number
+
+    # Выигравшие - игроки, у которых на этом ходе выпало последнее число карточки
+    numbers_left = {player.id: set(player.card.numbers_set) for player in players}
+    for number in master.get_number_sequence():
+        completed = []
+        for player_id, numbers in numbers_left.items():
+            if number in numbers:
+                numbers.discard(number)
+                if not numbers:
+                    completed.append(player_id)
+        assert sorted(master.completed_players) == sorted(completed)
+
+        steps = {player.id: player.make_step(number) for player in players}
+        assert sorted(master.check_steps(steps, number)['win']) == sorted(completed)
+        assert master.check_steps(steps, number)['mistake'] == []
+
+
+def test_game_replay():
+    """
+    Проверяет повтор игры по seed
+    """
+    def play(seed):
+        result = Game(person_count=0, computer_count=3, computer_mistake_chance=5, input_output=None,
+                      seed=seed).play()
+        return {key: [player.get_name() for player in players] for key, players in result.items()}
+
+    for seed in range(10):
+        assert play(seed) == play(seed)
+
 
 def test_check_fail_win():
     """
@@ -158,3 +283,230 @@ def test_check_fail_win():
     game_result = game.play()
     assert len(game_result['win']) == 1
     assert len(game_result['mistake']) == 1
+
+
+def test_input_output(capsys, monkeypatch):
+    """
+    Проверяет буферизованный вывод карточек и сообщений
+    """
+    def format_card(card):
+        return ''.join('  '.join(' .' if number is None else ' X' if number == X_NUMBER else str(number).rjust(2)
+                                 for number in row) + '\n' for row in card.numbers)
+
+    card = Cards().get_card()
+    numbers = [number for row in card.numbers for number in row if number is not None]
+    expected = ''
+    for number in numbers[::2]:
+        InputOutput.print_message(f'Номер: {number}')
+        InputOutput.print_card(card)
+        expected += f'\nНомер: {number}\n' + format_card(card)
+        card.mark_number(number)
+        InputOutput.print_card(card)
+        expected += format_card(card)
+
+    # До вызова flush ничего не выводится, затем весь текст выводится одной записью
+    assert capsys.readouterr().out == ''
+    writes = []
+    monkeypatch.setattr('sys.stdout.write', writes.append)
+    InputOutput.flush()
+    assert writes == [expected]
+
+    # Буфер после вывода пуст
+    InputOutput.flush()
+    assert len(writes) == 1
+
+
+def test_custom_input_output():
+    """
+    Проверяет игру с классом ввода/вывода без метода flush
+    """
+    class ListOutput:
+        """
+        Вывод в список
+        """
+        messages = []
+
+        @staticmethod
+        def get_step(number):
+            return False
+
+        @staticmethod
+        def print_message(message):
+            ListOutput.messages.append(message)
+
+        @staticmethod
+        def print_card(card):
+            pass
+
+    result = Game(person_count=0, computer_count=2, computer_mistake_chance=0, input_output=ListOutput,
+                  seed=1).play()
+    assert result['win']
+    assert ListOutput.messages[-1].endswith('выиграл.')
+
+
+def test_simulation():
+    """
+    Проверяет моделирование игр компьютеров
+    """
+    np = pytest.importorskip('numpy')
+    from lotto_game.simulation import generate_cards, Simulation, sweep
+
+    # Карточки: различные числа, по NUMBERS_IN_ROW в строке, столбцы по десяткам
+    cards = generate_cards(np.random.default_rng(1), 1000)
+    assert cards.shape == (1000, CARD_ROW_COUNT * NUMBERS_IN_ROW)
+    for card in cards:
+        assert len(set(card.tolist())) == CARD_ROW_COUNT * NUMBERS_IN_ROW
+        for row in card.reshape(CARD_ROW_COUNT, NUMBERS_IN_ROW):
+            columns = [min(number // 10, CARD_COL_COUNT - 1) for number in row.tolist()]
+            assert columns == sorted(set(columns))
+            assert all(MIN_NUMBER <= number <= MAX_NUMBER for number in row.tolist())
+
+    # Без ошибок все игры завершаются выигрышем не раньше, чем выпадут все числа одной карточки
+    stats = Simulation(computer_count=2, computer_mistake_chance=0, seed=1).run(10000)
+    assert stats.games == stats.wins == 10000
+    assert stats.mistakes == 0
+    assert stats.win_turns[:CARD_ROW_COUNT * NUMBERS_IN_ROW].sum() == 0
+    assert 0 < stats.tie_rate < 0.5
+
+    # Один игрок выигрывает без ничьих
+    assert Simulation(computer_count=1, computer_mistake_chance=0, seed=1).run(1000).ties == 0
+
+    # При вероятности ошибки 100% игра завершается ошибкой на первом ходе
+    stats = Simulation(computer_count=2, computer_mistake_chance=100, seed=1).run(1000)
+    assert stats.mistake_turns[1] == stats.games == 1000
+
+    # Результаты воспроизводимы
+    stats1 = Simulation(seed=5, batch_size=300).run(1000)
+    stats2 = Simulation(seed=5, batch_size=300).run(1000)
+    assert stats1.as_dict() == stats2.as_dict()
+
+    # Доля игр с ошибкой растет с вероятностью ошибки
+    results = sweep([0.01, 1, 10], 2000, seed=1)
+    mistake_rates = [stats.mistake_rate for _, stats in results]
+    assert mistake_rates == sorted(mistake_rates)
+    assert all(stats.games == 2000 for _, stats in results)
+
+    # Некорректные параметры
+    with pytest.raises(ValueError):
+        Simulation(computer_count=0)
+    with pytest.raises(ValueError):
+        Simulation(batch_size=0)
+
+
+def test_tournament(tmp_path):
+    """
+    Проверяет турнир в нескольких процессах
+    """
+    pytest.importorskip('numpy')
+    from lotto_game.tournament import Tournament
+
+    output_path = tmp_path / 'tournament.csv'
+    tournament = Tournament(computer_counts=(2, 3), mistake_chances=(0, 1), games=2500, shard_size=1000,
+                            processes=2, seed=1)
+    results = tournament.run(str(output_path))
+    assert sorted(results) == [(2, 0), (2, 1), (3, 0), (3, 1)]
+    assert all(stats.games == 2500 for stats in results.values())
+    assert results[(2, 0)].mistakes == 0
+
+    # Строки частей и итоговые строки
+    with open(output_path, encoding='utf-8') as file:
+        rows = list(csv.DictReader(file))
+    assert len(rows) == 4 * 3 + 4
+    assert sum(int(row['games']) for row in rows if row['shard'] != 'total') == 4 * 2500
+    assert [row['shard'] for row in rows[-4:]] == ['total'] * 4
+
+    # Результаты не зависят от количества процессов
+    results_single = Tournament(computer_counts=(2, 3), mistake_chances=(0, 1), games=2500, shard_size=1000,
+                                processes=1, seed=1).run()
+    assert {params: stats.as_dict() for params, stats in results.items()} == \
+        {params: stats.as_dict() for params, stats in results_single.items()}
+
+    # Некорректные параметры
+    with pytest.raises(ValueError):
+        Tournament(games=-1)
+    with pytest.raises(ValueError):
+        Tournament(games=1.5)
+    with pytest.raises(ValueError):
+        Tournament(shard_size=0)
+
+
+def test_game_server():
+    """
+    Проверяет сервер игры с большим количеством игроков
+    """
+    from lotto_game.server import Connection, GameServer, LocalConnection, RemotePlayer, play_tcp_bot
+
+    class SilentConnection(Connection):
+        """
+        Игрок, не делающий ходов
+        """
+        async def send(self, message):
+            pass
+
+        async def receive(self):
+            await asyncio.Event().wait()
+
+    async def play_local():
+        server = GameServer(turn_timeout=0.05, seed=1)
+        for idx in range(1000):
+            server.add_connection(LocalConnection(Computer(f'Компьютер {idx}', mistake_chance=0)))
+        silent = RemotePlayer('Молчун')
+        server.add_connection(SilentConnection(silent))
+        return server, silent, await server.play()
+
+    server, silent, result = asyncio.run(play_local())
+    assert result['win']
+    assert result['mistake'] == [silent.id]
+    assert CARD_ROW_COUNT * NUMBERS_IN_ROW <= result['turns'] <= MAX_NUMBER - MIN_NUMBER + 1
+    for player_id in result['win']:
+        assert not server.connections[player_id].player.card.numbers_set
+
+    tcp_server = GameServer(turn_timeout=5)
+
+    async def play_tcp():
+        server = tcp_server
+        host, port = await server.start_tcp()
+        bots = [asyncio.ensure_future(play_tcp_bot(host, port, f'Бот {idx}', mistake_chance=100 if idx == 0 else 0))
+                for idx in range(5)]
+        while len(server.connections) < 5:
+            await asyncio.sleep(0.01)
+        return await server.play(), await asyncio.gather(*bots)
+
+    result, bot_results = asyncio.run(play_tcp())
+    assert bot_results[0] == 'mistake'
+    assert len(result['mistake']) == 1
+    assert sorted(set(bot_results[1:])) in (['win'], ['lose', 'win'])
+    assert bot_results.count('win') == len(result['win'])
+
+    # Карточки игроков, подключенных по TCP, закрашиваются на сервере
+    for player_id in result['win']:
+        assert isinstance(tcp_server.connections[player_id].player, RemotePlayer)
+        assert not tcp_server.connections[player_id].player.card.numbers_set
+
+    async def play_disconnect():
+        server = GameServer(turn_timeout=5)
+        host, port = await server.start_tcp()
+        bots = [asyncio.ensure_future(play_tcp_bot(host, port, f'Бот {idx}', mistake_chance=0)) for idx in range(2)]
+
+        # Игрок отключается после получения карточки
+        async def quit_game():
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.write(json.dumps({'type': 'join', 'name': 'Беглец'}).encode('utf-8') + b'\n')
+            await reader.readline()
+            writer.close()
+
+        quitter = asyncio.ensure_future(quit_game())
+        while len(server.connections) < 3:
+            await asyncio.sleep(0.01)
+        result = await server.play()
+        await quitter
+        await asyncio.gather(*bots)
+        return server, result
+
+    # Ход отключившегося игрока не ожидается до истечения turn_timeout
+    start_time = time.monotonic()
+    server, result = asyncio.run(play_disconnect())
+    assert time.monotonic() - start_time < 5
+    quitter_id, = result['disconnected']
+    assert server.connections[quitter_id].player.get_name() == 'Беглец'
+    assert result['win'] and quitter_id not in result['win']